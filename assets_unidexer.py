@@ -3,12 +3,11 @@ VERSION = (1, 2, 0)
 import argparse
 import os.path
 import pathlib
-import shutil
 from collections import OrderedDict
 
 from common import (
-    find_output, get_latest, hash_test, make_dirname, read_json,
-    read_manifest_json, run_animation, safe_del, urlretrieve,
+    AssetIndex, download_assets, find_output, get_latest, make_dirname,
+    place_output, read_manifest_json, run_animation,
     valide_output, valide_version, work_done, write_json,
 )
 
@@ -20,13 +19,15 @@ parser.add_argument('-f', '--overwrite', help='Overwrite on the existing output
 
 parser.add_argument('-o', '--output', help='Output folder', type=pathlib.Path)
 parser.add_argument('--manifest-json', help='Local JSON manifest file of the target version.', type=pathlib.Path)
+parser.add_argument('--no-update-check', help='Don\'t check online for new versions of Minecraft, use the local version_manifest.json.', action='store_true')
 
 args = parser.parse_args()
 
 def main():
     from common import update_version_manifest
     
-    update_version_manifest()
+    if not args.no_update_check:
+        update_version_manifest()
     
     print(f'--==| Minecraft: Assets Unindexer |==--')
     print()
@@ -76,40 +77,29 @@ def unindex_assets(args):
     
     
     async def index_dl():
-        urlretrieve(assets_json['asset_index'], assets_json_path)
-        pass
+        index_dl.index = AssetIndex.download(assets_json['assets'], assets_json['asset_index'])
     run_animation(index_dl, 'Downloading index.json')
     
-    for k,v in read_json(assets_json_path).items():
-        assets_json[k] = v
-    
-    for k,v in assets_json['objects'].items():
-        hash = v['hash']
-        v['url'] = 'http://resources.download.minecraft.net/'+hash[0:2]+'/'+hash
-    
-    write_json(assets_json_path, assets_json)
+    index = index_dl.index
+    # the unindexed JSON keeps the order of the index and the http URLs
+    write_json(assets_json_path, index.to_json(sort_objects=False, assets_url='http://resources.download.minecraft.net/'))
     
     
     async def assets_dl():
-        for name,asset in assets_json['objects'].items():
-            file = os.path.join(temp, name)
-            
-            if not hash_test(asset['hash'], file):
-                safe_del(file)
-                make_dirname(file)
-                urlretrieve(asset['url'], file)
-        
+        assets_dl.rslt = download_assets(index.entries(), temp)
     run_animation(assets_dl, 'Downloading assets')
     
+    rslt = assets_dl.rslt
+    mb = rslt['bytes'] / 2**20
+    print(f"{rslt['files']} files, {rslt['downloaded']} downloaded ({mb:.1f} MiB), {rslt['linked']} hardlinked,",
+          f"in {rslt['duration']:.1f}s ({mb / (rslt['duration'] or 1):.2f} MiB/s)")
+    
     async def copy_assets_data():
-        if os.path.exists(output):
-            if args.overwrite:
-                safe_del(output)
-            else:
-                print(f'The output at "{output}" already exit and the overwrite is not enable')
-                return -1
+        if os.path.exists(output) and not args.overwrite:
+            print(f'The output at "{output}" already exit and the overwrite is not enable')
+            return -1
         
-        shutil.copytree(temp, output)
+        place_output(temp, output)
         
     run_animation(copy_assets_data, f'Move generated data to "{output}"')
 
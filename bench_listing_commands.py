@@ -0,0 +1,50 @@
+import argparse
+import os.path
+import shutil
+import time
+import tracemalloc
+from tempfile import TemporaryDirectory
+
+from common import write_json
+from generated_data_builder import listing_commands
+
+parser = argparse.ArgumentParser(description='Benchmark listing_commands on the reports/commands.json of a generated tree, or on a synthetic one.')
+parser.add_argument('tree', help='Built Generated data version, a synthetic tree is used if missing', nargs='?')
+parser.add_argument('--depth', help='Depth of the synthetic command tree (default: 8)', type=int, default=8)
+parser.add_argument('--width', help='Children by node of the synthetic command tree (default: 4)', type=int, default=4)
+
+def synthetic_commands(depth, width) -> dict:
+    # every node is executable, so each one is a syntax line
+    def node(level):
+        entry = {'type': 'argument', 'parser': 'brigadier:integer', 'executable': True}
+        if level < depth:
+            entry['children'] = {f'arg{i}': node(level+1) for i in range(width)}
+        return entry
+    return {'type': 'root', 'children': {'cmd': {'type': 'literal', 'executable': True, 'children': node(1)['children']}}}
+
+def main(args):
+    with TemporaryDirectory() as temp:
+        commands_json = os.path.join(temp, 'reports', 'commands.json')
+        if args.tree:
+            os.makedirs(os.path.dirname(commands_json))
+            shutil.copyfile(os.path.join(args.tree, 'reports', 'commands.json'), commands_json)
+        else:
+            write_json(commands_json, synthetic_commands(args.depth, args.width))
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        listing_commands(temp)
+        duration = time.perf_counter() - start
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        lines = 0
+        for f in os.listdir(os.path.join(temp, 'lists', 'commands')):
+            if f.endswith('.txt'):
+                with open(os.path.join(temp, 'lists', 'commands', f), 'rb') as fi:
+                    lines += fi.read().count(b'\n')
+        print(f'listing_commands {duration:8.3f} s  peak {peak/2**20:8.1f} MiB  {lines} syntax lines')
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,60 @@
+import argparse
+import glob
+import os.path
+import shutil
+import time
+from tempfile import TemporaryDirectory
+
+import generated_data_builder
+from generated_data_builder import listing_worldgens, match_dir
+
+parser = argparse.ArgumentParser(description='Benchmark listing_worldgens on a generated tree, with the number of biome parses.')
+parser.add_argument('tree', help='Built Generated data version')
+parser.add_argument('-r', '--repeat', help='Number of runs, the best is kept (default: 3)', type=int, default=3)
+
+def counted_read_json(counter):
+    read_json = generated_data_builder.read_json
+    def wrapper(path, *args, **kargs):
+        parts = os.path.normpath(path).split(os.sep)
+        if 'biome' in parts:
+            counter['biome'] += 1
+        elif 'biomes' in parts:
+            counter['legacy'] += 1
+        return read_json(path, *args, **kargs)
+    return wrapper
+
+def worldgen_subdirs(tree) -> int:
+    # before the hoist, the biomes of the datapacks were parsed again for each of them
+    dir = match_dir(tree, [
+        'data/minecraft/worldgen',
+        'reports/minecraft/worldgen', # old
+        'reports/worldgen/minecraft/worldgen', # legacy
+    ])
+    return len(glob.glob('*/', root_dir=os.path.join(tree, dir)))
+
+def main(args):
+    times = []
+    counter = {'biome': 0, 'legacy': 0}
+    read_json = generated_data_builder.read_json
+    generated_data_builder.read_json = counted_read_json(counter)
+    try:
+        with TemporaryDirectory() as temp:
+            for _ in range(args.repeat):
+                work = os.path.join(temp, 'tree')
+                shutil.rmtree(work, ignore_errors=True)
+                shutil.copytree(args.tree, work, ignore=shutil.ignore_patterns('lists', '*.zip'))
+                counter.update(biome=0, legacy=0)
+                start = time.perf_counter()
+                listing_worldgens(work)
+                times.append(time.perf_counter() - start)
+            subdirs = worldgen_subdirs(work)
+    finally:
+        generated_data_builder.read_json = read_json
+    
+    parses = counter['biome'] + counter['legacy']
+    before = counter['biome']*subdirs + counter['legacy']
+    print(f'listing_worldgens {min(times):8.3f} s  {parses} biome parses (before the hoist: {before}, {subdirs} worldgen registries)')
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
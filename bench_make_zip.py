@@ -0,0 +1,40 @@
+import argparse
+import os.path
+import shutil
+import time
+import zipfile
+from tempfile import TemporaryDirectory
+
+from common import make_zip_archive
+
+parser = argparse.ArgumentParser(description='Benchmark make_zip_archive against shutil.make_archive on a generated tree.')
+parser.add_argument('tree', help='Folder to empack, a built Generated data version')
+parser.add_argument('--zip-level', help='Compression level of make_zip_archive (default: 6)', type=int, choices=range(10), default=6)
+parser.add_argument('-j', '--jobs', help='Number of threads of make_zip_archive (default: number of CPU)', type=int)
+parser.add_argument('-r', '--repeat', help='Number of runs of each, the best is kept (default: 3)', type=int, default=3)
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(args):
+    with TemporaryDirectory() as temp:
+        old = os.path.join(temp, 'make_archive')
+        new = os.path.join(temp, 'make_zip_archive.zip')
+
+        t_old = best_of(args.repeat, lambda: shutil.make_archive(old, 'zip', root_dir=args.tree))
+        t_new = best_of(args.repeat, lambda: make_zip_archive(new, args.tree, compresslevel=args.zip_level, workers=args.jobs))
+
+        for name, path, t in [('make_archive', old+'.zip', t_old), ('make_zip_archive', new, t_new)]:
+            with zipfile.ZipFile(path) as zip:
+                entries = len(zip.filelist)
+            print(f'{name:<18} {t:8.3f} s  {os.path.getsize(path):>12} bytes  {entries} entries')
+        print(f'speedup: {t_old/t_new:.2f}x')
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,38 @@
+import argparse
+import os.path
+import subprocess
+import sys
+import time
+
+parser = argparse.ArgumentParser(description='Benchmark the startup of the tools: import time of the modules and of a offline run.')
+parser.add_argument('-r', '--repeat', help='Number of runs, the best is kept (default: 5)', type=int, default=5)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MODULES = ['common', 'generated_data_builder', 'assets_unidexer']
+
+def import_time(module) -> int:
+    # cumulative import time in µs reported by -X importtime
+    rslt = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT, capture_output=True, text=True)
+    for line in rslt.stderr.splitlines():
+        parts = [p.strip() for p in line.removeprefix('import time:').split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise RuntimeError(f'No import time for {module!r}:\n{rslt.stderr}')
+
+def run_time(args) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True)
+    return time.perf_counter() - start
+
+def main(args):
+    for module in MODULES:
+        best = min(import_time(module) for _ in range(args.repeat))
+        print(f'import {module:<24} {best/1000:8.1f} ms')
+
+    cmd = ['generated_data_builder.py', '--no-update-check', '--help']
+    best = min(run_time(cmd) for _ in range(args.repeat))
+    print(f'{" ".join(cmd):<31} {best*1000:8.1f} ms')
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,58 @@
+import argparse
+import json
+import os.path
+import random
+import re
+import time
+
+from common import iter_json_items
+from generated_data_builder import unquoted_json
+
+parser = argparse.ArgumentParser(description='Benchmark unquoted_json against the previous dump-then-regex version.')
+parser.add_argument('tree', help='Built Generated data version, its item components are used; synthetic values if missing', nargs='?')
+parser.add_argument('-n', '--number', help='Number of synthetic values (default: 100000)', type=int, default=100000)
+
+def unquoted_json_regex(obj) -> str:
+    # previous implementation
+    return re.sub(r'"([^":\\/]+)":', r'\1:', json.dumps(obj, indent=None))
+
+def item_component_values(tree) -> list:
+    values = []
+    for _k,v in iter_json_items(os.path.join(tree, 'reports', 'items.json')):
+        components = v.get('components', {})
+        if isinstance(components, list):
+            values.extend(c['value'] for c in components)
+        else:
+            values.extend(components.values())
+    return values
+
+def synthetic_values(number) -> list:
+    rnd = random.Random(0)
+    def value(depth=0):
+        match rnd.randrange(6 if depth < 3 else 4):
+            case 0: return rnd.randrange(-100, 100)
+            case 1: return rnd.random()*100
+            case 2: return rnd.choice(['minecraft:stone', 'é', '', 'a b'])
+            case 3: return rnd.choice([True, False, None])
+            case 4: return [value(depth+1) for _ in range(rnd.randrange(4))]
+            case 5: return {rnd.choice(['type', 'amount', 'minecraft:id', 'slot']): value(depth+1) for _ in range(rnd.randrange(4))}
+    return [value() for _ in range(number)]
+
+def timed(func, values) -> float:
+    start = time.perf_counter()
+    for v in values:
+        func(v)
+    return time.perf_counter() - start
+
+def main(args):
+    values = item_component_values(args.tree) if args.tree else synthetic_values(args.number)
+    t_old = timed(unquoted_json_regex, values)
+    t_new = timed(unquoted_json, values)
+    different = sum(1 for v in values if unquoted_json(v) != unquoted_json_regex(v))
+    print(f'{len(values)} values')
+    print(f'dump+regex    {t_old:8.3f} s')
+    print(f'unquoted_json {t_new:8.3f} s  speedup {t_old/t_new:.2f}x  {different} different outputs')
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -33,8 +33,11 @@ def run_animation(awaitable, text_wait, text_end=None):
     animation_run = True
     t = Thread(target=start_animation)
     t.start()
-    asyncio.run(awaitable())
-    animation_run = False
+    try:
+        asyncio.run(awaitable())
+    finally:
+        # don't leave the animation running when the task fails (daemon workers survive the errors)
+        animation_run = False
     msg = ' '.join([text_wait, text_end or '> OK'])
     print(msg+' '*(len(msg_last)-len(msg)+1))
     time.sleep(0.2)
@@ -69,6 +72,172 @@ def run_command(command_line, wait=True):
     return subproc
 
 
+def run_jobs(func, args_list, chunksize=None):
+    """
+    Run func(*args) for each args of args_list in a process pool
+    
+    The results are returned in the order of args_list, and the first exception
+    in this order is raised. With run_jobs.jobs set to 1, all run in the current process.
+    
+    :type func:         function
+    :param func:        module level function, so it can be pickled
+    :type args_list:    iterable
+    :param args_list:   the arguments of each call
+    :type chunksize:    int
+    :param chunksize:   number of calls sent to a worker in one time
+    :rtype:             list
+    """
+    args_list = list(args_list)
+    jobs = run_jobs.jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(args_list) <= 1:
+        return [func(*args) for args in args_list]
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    chunksize = chunksize or max(1, len(args_list) // (jobs*4))
+    with ProcessPoolExecutor(jobs) as executor:
+        return list(executor.map(func, *zip(*args_list), chunksize=chunksize))
+run_jobs.jobs = None
+
+
+class JSONBackend():
+    """
+    JSON backend of read_json/write_json, the stdlib one
+    
+    A backend must produce the same objects and the same bytes than the stdlib
+    (indent=2, ensure_ascii=False), so the generated data don't change with it.
+    """
+    name = 'json'
+    
+    def loads(self, data: bytes|str):
+        return json.loads(data)
+    
+    def dumps(self, obj, sort_keys: bool=False) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys).encode('utf-8')
+
+class OrjsonBackend(JSONBackend):
+    name = 'orjson'
+    
+    def __init__(self):
+        import re
+        
+        import orjson
+        self.orjson = orjson
+        # a line with a float value of the indented output
+        self.float_line = re.compile(rb'^( *(?:"(?:[^"\\\n]|\\.)*": )?)(-?\d+(?:\.\d+(?:e[-+]?\d+)?|e[-+]?\d+))(,?)$', re.MULTILINE)
+    
+    def loads(self, data: bytes|str):
+        try:
+            return self.orjson.loads(data)
+        except self.orjson.JSONDecodeError:
+            # NaN and Infinity; the int above 64 bits are decoded as float without error
+            # by some versions, the conformance test reject them (see JSON_CONFORMANCE_SAMPLE)
+            return json.loads(data)
+    
+    def dumps(self, obj, sort_keys: bool=False) -> bytes:
+        option = self.orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= self.orjson.OPT_SORT_KEYS
+        try:
+            rslt = self.orjson.dumps(obj, option=option)
+        except TypeError:
+            # not str keys, big int, surrogates
+            return super().dumps(obj, sort_keys=sort_keys)
+        if b'null' in rslt and self._has_non_finite(obj):
+            # orjson write NaN and Infinity as null, without error
+            return super().dumps(obj, sort_keys=sort_keys)
+        # orjson don't use the same exponent notation than float.__repr__
+        return self.float_line.sub(self._float_repr, rslt)
+    
+    @staticmethod
+    def _has_non_finite(obj) -> bool:
+        import math
+        
+        stack = [obj]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, float):
+                if not math.isfinite(obj):
+                    return True
+            elif isinstance(obj, dict):
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple)):
+                stack.extend(obj)
+        return False
+    
+    @staticmethod
+    def _float_repr(match):
+        value = repr(float(match.group(2))).encode('ascii')
+        if value == match.group(2):
+            return match.group(0)
+        return match.group(1) + value + match.group(3)
+
+class UjsonBackend(JSONBackend):
+    # decode only, ujson don't have the same indented output
+    name = 'ujson'
+    
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+    
+    def loads(self, data: bytes|str):
+        try:
+            return self.ujson.loads(data)
+        except ValueError:
+            return json.loads(data)
+
+JSON_CONFORMANCE_SAMPLE = {
+    'numbers': [0, -1, 2**63-1, 2**64+1, -2**64-1, 0.1, -0.0, 1.0, 100.0, 1e-05, 0.0001, 1e-07, 0.0001234, 1e15, 1e16, 1.5e+17, 123456789012345.6, 1e22, 1.7976931348623157e+308, 5e-324],
+    'non_finite': [float('nan'), float('inf'), float('-inf'), None],
+    'strings': ['', 'a\x00\x1f\x7f"\\/\n\t\b\f\r', '\u00e9\u2028\U0001f600', '1e5', 'k: 1.5'],
+    'containers': [{}, [], {'z': None, 'a': True, 'm': False}, [[1.5], {'x': [1e-05]}]],
+    'k: 1.5": 1e5': 1e-05,
+    '\u00e9': 'minecraft:stone',
+}
+
+def json_conformance(backend: JSONBackend) -> bool:
+    """
+    Test if the backend produce the same bytes and objects than the stdlib JSON
+    """
+    std = JSONBackend()
+    try:
+        # each value is also tested alone, so a fallback on one of them don't hide the others
+        for sample in [JSON_CONFORMANCE_SAMPLE] + list(JSON_CONFORMANCE_SAMPLE.values()):
+            for sort_keys in [False, True]:
+                data = std.dumps(sample, sort_keys=sort_keys)
+                if backend.dumps(sample, sort_keys=sort_keys) != data:
+                    return False
+                # compared by their dump, NaN is not equal to itself
+                if std.dumps(backend.loads(data), sort_keys=sort_keys) != data:
+                    return False
+    except Exception:
+        return False
+    return True
+
+def json_backend() -> JSONBackend:
+    """
+    The fastest JSON backend installed (orjson, ujson, stdlib) that pass the conformance test.
+    The environ variable MC_JSON_BACKEND can force one of them.
+    """
+    if json_backend.backend is None:
+        backends = [OrjsonBackend, UjsonBackend]
+        forced = os.environ.get('MC_JSON_BACKEND')
+        if forced:
+            backends = [b for b in backends if b.name == forced]
+        
+        json_backend.backend = JSONBackend()
+        for backend in backends:
+            try:
+                backend = backend()
+            except ImportError:
+                continue
+            if json_conformance(backend):
+                json_backend.backend = backend
+                break
+    
+    return json_backend.backend
+json_backend.backend = None
+
 def make_dirname(path):
     dir = os.path.dirname(path)
     if dir:
@@ -77,38 +246,288 @@ def make_dirname(path):
 def read_json(path, default=None):
     try:
         with open(path, 'rb') as f:
-            return json.loads(f.read())
+            return json_backend().loads(f.read())
     except:
         return default or {}
 
+class _JSONStream():
+    """
+    Incremental reader of a JSON text file, the values are decoded one by one
+    from a buffer filled by chunks
+    """
+    def __init__(self, file, chunk_size: int):
+        import re
+        
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+        self.whitespace = re.compile(r'[ \t\n\r]*')
+    
+    def read(self, size: int=None) -> bool:
+        data = self.file.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        # next not whitespace char, empty at the end of the file
+        while True:
+            self.pos = self.whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.read():
+                return ''
+    
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f'Expecting {char!r} in the JSON stream of {self.file.name!r}.')
+        self.pos += 1
+    
+    def value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number can be truncated at the end of the buffer (1234|5 or 1.5|e-7)
+                if (end < len(self.buf) and self.buf[end] in ',:]} \t\n\r') or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read(size)
+            size *= 2
+    
+    def keys(self):
+        # iterate the keys of a object, the value of each key must be consumed before the next one
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            match self.peek():
+                case ',':
+                    self.pos += 1
+                case '}':
+                    self.pos += 1
+                    return
+                case _:
+                    raise ValueError(f'Expecting \',\' or \'}}\' in the JSON stream of {self.file.name!r}.')
+
+def iter_json_items(path, *keys, chunk_size=2**20):
+    """
+    Iterate the (key, value) of a JSON object without loading the whole file
+    
+    :type path:         string
+    :param path:        JSON file, nothing is yielded if it doesn't exist
+    :type keys:         string
+    :param keys:        keys of the nested object to iterate instead of the root object
+    :type chunk_size:   int
+    :param chunk_size:  size of the read chunks
+    """
+    def iter_keys(stream, keys):
+        for key in stream.keys():
+            if not keys:
+                yield key, stream.value()
+            elif key == keys[0] and stream.peek() == '{':
+                yield from iter_keys(stream, keys[1:])
+            else:
+                stream.value()
+    
+    if not os.path.exists(path):
+        return
+    with open(path, 'rt', encoding='utf-8') as f:
+        yield from iter_keys(_JSONStream(f, chunk_size), keys)
+
 def write_json(path, obj, sort_keys: bool=False):
+    write_bytes(path, json_backend().dumps(obj, sort_keys=sort_keys))
+
+def write_json_items(path, items) -> bool:
+    """
+    Write a JSON object from an iterable of (key, value), with the same bytes write_json() would write for the whole dict,
+    without building it. Return False if the file has not been written (see write_bytes.if_changed)
+    """
+    backend = json_backend()
+    def chunks():
+        sep = b'{\n  '
+        for key, value in items:
+            yield sep + backend.dumps(key) + b': ' + backend.dumps(value).replace(b'\n', b'\n  ')
+            sep = b',\n  '
+        yield b'{}' if sep == b'{\n  ' else b'\n}'
+    return write_chunks(path, chunks())
+
+def normalize_newlines(path, chunk_size=2**20) -> bool:
+    """Convert the CRLF and CR newlines of a text file to LF, the file is streamed and rewritten only if it contains one of them"""
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                return False
+            if b'\r' in data:
+                break
+    
+    tmp = path+'.tmp'
+    with open(path, 'rt', encoding='utf-8') as fi, open(tmp, 'wt', newline='\n', encoding='utf-8') as fo:
+        while True:
+            data = fi.read(chunk_size)
+            if not data:
+                break
+            fo.write(data)
+    os.replace(tmp, path)
+    return True
+
+def same_content(path, data: bytes, chunk_size=2**20) -> bool:
+    # the size is checked first, then the file is compared to the data by chunks
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            view = memoryview(data)
+            for i in range(0, len(data), chunk_size):
+                if f.read(chunk_size) != view[i:i+chunk_size]:
+                    return False
+    except OSError:
+        return False
+    return True
+
+def write_bytes(path, data: bytes) -> bool:
+    """
+    Write the data in the file, return False if the file has not been written
+    
+    If write_bytes.if_changed is True, a file that already contains the data is left untouched (content and mtime).
+    Use touch() when a new timestamp is wanted.
+    
+    An existing file is replaced by a new one, never rewritten in place, so its hardlinks (see place_output) keep the old content.
+    """
+    make_dirname(path)
+    if write_bytes.if_changed and same_content(path, data):
+        return False
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+        return True
+    tmp = path+'.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+write_bytes.if_changed = True
+
+def encode_chunks(texts, chunk_size=2**16):
+    # group the small strings in UTF-8 chunks of about chunk_size bytes
+    buf = []
+    size = 0
+    for t in texts:
+        buf.append(t)
+        size += len(t)
+        if size >= chunk_size:
+            yield ''.join(buf).encode('utf-8')
+            buf.clear()
+            size = 0
+    if buf:
+        yield ''.join(buf).encode('utf-8')
+
+def _copy_prefix(src, dst, size, chunk_size=2**20):
+    src.seek(0)
+    while size > 0:
+        data = src.read(min(size, chunk_size))
+        dst.write(data)
+        size -= len(data)
+
+def write_chunks(path, chunks) -> bool:
+    """
+    Write the file from an iterable of bytes, streamed. Return False if the file has not been written
+    
+    If write_bytes.if_changed is True, the chunks are compared to the existing file as they are produced:
+    a temp file is only started at the first difference, then replace the file.
+    Like write_bytes(), an existing file is never rewritten in place.
+    """
     make_dirname(path)
-    with open(path, 'wt', newline='\n', encoding='utf-8') as f:
-        f.write(json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys))
+    if not os.path.isfile(path):
+        with open(path, 'wb') as f:
+            for data in chunks:
+                f.write(data)
+        return True
+    
+    tmp = path+'.tmp'
+    if not write_bytes.if_changed:
+        with open(tmp, 'wb') as f:
+            for data in chunks:
+                f.write(data)
+        os.replace(tmp, path)
+        return True
+    
+    out = None
+    try:
+        with open(path, 'rb') as old:
+            same = 0
+            for data in chunks:
+                if out is None:
+                    if old.read(len(data)) == data:
+                        same += len(data)
+                        continue
+                    out = open(tmp, 'wb')
+                    _copy_prefix(old, out, same)
+                out.write(data)
+            if out is None:
+                if not old.read(1):
+                    return False
+                # the new content is a prefix of the old one
+                out = open(tmp, 'wb')
+                _copy_prefix(old, out, same)
+        out.close()
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return True
+
+def touch(path):
+    # update the timestamps of a file without rewriting it
+    os.utime(path)
 
 def read_text(path):
     with open(path, 'rt', encoding='utf-8') as f:
         return ''.join(f.readlines())
 
 def write_text(path, text):
-    make_dirname(path)
-    with open(path, 'wt', newline='\n', encoding='utf-8') as f:
-        f.write(text)
+    write_bytes(path, text.encode('utf-8'))
 
 def read_lines(path):
     return [l for l in read_text(path).splitlines(False)]
 
 def write_lines(path, lines, newline_end=True):
-    make_dirname(path)
-    with open(path, 'wt', newline='\n', encoding='utf-8') as f:
-        if len(lines) == 0:
-            f.write('')
-        else:
-            n = '\n'
-            s = n.join(lines)
-            f.write(s)
-            if newline_end and s and s[-1] != n:
-                f.write(n)
+    n = '\n'
+    if not isinstance(lines, (list, tuple)):
+        # iterable, the lines are streamed
+        def chunks():
+            last = None
+            for l in lines:
+                if last is not None:
+                    yield n
+                yield l
+                last = l
+            if newline_end and last and last[-1] != n:
+                yield n
+        write_chunks(path, encode_chunks(chunks()))
+        return
+    
+    s = n.join(lines)
+    if newline_end and s and s[-1] != n:
+        s += n
+    write_text(path, s)
 
 
 def safe_del(path):
@@ -140,6 +559,82 @@ def remove_empty(path):
         if len(os.listdir(p)) == 0:
             os.rmdir(p)
 
+def copy_reflink(src, dst):
+    """
+    Copy a file by reflink (copy-on-write clone) when the filesystem support it,
+    else fallback to a normal copy
+    """
+    import shutil
+    
+    if copy_reflink.supported:
+        try:
+            import fcntl
+            with open(src, 'rb') as fi, open(dst, 'wb') as fo:
+                fcntl.ioctl(fo.fileno(), 0x40049409, fi.fileno()) # FICLONE
+            shutil.copystat(src, dst)
+            return dst
+        except (ImportError, OSError):
+            copy_reflink.supported = False
+            safe_del(dst)
+    return shutil.copy2(src, dst)
+copy_reflink.supported = True
+
+def place_output(src, dst, move=False):
+    """
+    Place the folder src at dst with the cheapest strategy for the filesystems:
+    rename, hardlink tree, reflink and at last copy.
+    
+    With the hardlink tree, src and dst share their files: src must only be changed
+    by replacing its files (like write_bytes() do), not by rewriting them in place.
+    
+    The folder is build in a staging folder next to dst, then swapped with the
+    old dst by two renames, so it is never visible in a half-deleted state.
+    The swap is not atomic: dst doesn't exist for a moment between the renames.
+    
+    :type src:      string
+    :param src:     folder to place
+    :type dst:      string
+    :param dst:     final path of the folder
+    :type move:     bool
+    :param move:    src is not kept
+    :rtype:         string
+    :return:        the strategy used
+    """
+    import shutil
+    
+    dst = os.path.abspath(dst)
+    parent = os.path.dirname(dst)
+    os.makedirs(parent, exist_ok=True)
+    staging = dst + '.staging'
+    old = dst + '.old'
+    safe_del(staging)
+    safe_del(old)
+    
+    same_fs = os.stat(src).st_dev == os.stat(parent).st_dev
+    if move and same_fs:
+        os.rename(src, staging)
+        strategy = 'rename'
+    else:
+        strategy = None
+        if same_fs:
+            try:
+                shutil.copytree(src, staging, copy_function=os.link)
+                strategy = 'hardlink'
+            except OSError:
+                safe_del(staging)
+        if not strategy:
+            copy_reflink.supported = True
+            shutil.copytree(src, staging, copy_function=copy_reflink)
+            strategy = 'reflink' if copy_reflink.supported else 'copy'
+        if move:
+            safe_del(src)
+    
+    if os.path.exists(dst):
+        os.rename(dst, old)
+    os.rename(staging, dst)
+    safe_del(old)
+    return strategy
+
 
 def hash_file(file, buffer_size=65536):
     if os.path.exists(file):
@@ -162,6 +657,353 @@ def hash_test(hash, file):
         return hash == hash_file(file)
     return False
 
+def hash_tree(root, exclude=[], workers=None) -> dict[str, tuple[int, str]]:
+    """Return {relative path: (size, sha1)} of all the files in root, the top level entries in exclude are skipped"""
+    from concurrent.futures import ThreadPoolExecutor
+    
+    workers = workers or os.cpu_count() or 1
+    
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace('\\', '/')
+        if rel_dir == '.':
+            dirnames[:] = [d for d in dirnames if d not in exclude]
+            filenames = [f for f in filenames if f not in exclude]
+            rel_dir = ''
+        else:
+            rel_dir += '/'
+        files.extend(rel_dir+f for f in filenames)
+    files.sort()
+    
+    def task(name):
+        path = os.path.join(root, name)
+        return os.path.getsize(path), hash_file(path)
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(files, executor.map(task, files)))
+
+
+ASSETS_URL = 'https://resources.download.minecraft.net/'
+
+def asset_url(hash):
+    return ASSETS_URL+hash[0:2]+'/'+hash
+
+def asset_test(hash, size, file):
+    # the size is checked first to skip the SHA-1 of a file that cannot match
+    if size is not None and (not os.path.exists(file) or os.path.getsize(file) != size):
+        return False
+    return hash_test(hash, file)
+
+def download_assets(assets, root, workers=8):
+    """
+    Download the assets objects in root. The objects that share a hash
+    are downloaded once and the duplicate names are hardlinked.
+    
+    :type assets:   iterable
+    :param assets:  objects of the asset index as (name, hash, size)
+    :type root:     string
+    :param root:    folder where the assets are written
+    :type workers:  int
+    :param workers: number of concurrent downloads
+    :rtype:         dict
+    :return:        the counts of files, downloaded files, downloaded bytes, linked files and the duration
+    """
+    import shutil
+    import time
+    from collections import defaultdict
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Lock
+    
+    start = time.monotonic()
+    groups = defaultdict(list)
+    sizes = {}
+    files = 0
+    for name, hash, size in assets:
+        groups[hash].append(name)
+        sizes[hash] = size
+        files += 1
+    
+    rslt = {'files': files, 'downloaded': 0, 'bytes': 0, 'linked': 0, 'duration': 0}
+    lock = Lock()
+    done = 0
+    
+    def fetch(hash, names):
+        nonlocal done
+        size = sizes[hash]
+        files = [os.path.join(root, n) for n in names]
+        source = next((f for f in files if asset_test(hash, size, f)), None)
+        downloaded = 0
+        if not source:
+            source = files[0]
+            safe_del(source)
+            make_dirname(source)
+            urlretrieve(asset_url(hash), source)
+            downloaded = os.path.getsize(source)
+        
+        linked = 0
+        for f in files:
+            if f == source or (os.path.exists(f) and os.path.samefile(f, source)):
+                continue
+            safe_del(f)
+            make_dirname(f)
+            try:
+                os.link(source, f)
+            except OSError:
+                shutil.copyfile(source, f)
+            linked += 1
+        
+        with lock:
+            done += 1
+            if downloaded:
+                rslt['downloaded'] += 1
+                rslt['bytes'] += downloaded
+            rslt['linked'] += linked
+            run_animation.extra = f'{done}/{len(groups)}'
+    
+    with ThreadPoolExecutor(workers) as executor:
+        for future in [executor.submit(fetch, hash, names) for hash, names in groups.items()]:
+            future.result()
+    
+    rslt['duration'] = time.monotonic() - start
+    return rslt
+
+class AssetIndex():
+    """
+    Compact asset index, the objects are stored in parallel arrays sorted by name
+    and the URLs are derived on demand from the hash.
+    """
+    __slots__ = ('assets', 'asset_index', 'extra', 'names', 'hashes', 'sizes', 'order')
+    
+    def __init__(self, assets, asset_index, index_json: dict):
+        from array import array
+        
+        self.assets = assets
+        self.asset_index = asset_index
+        
+        objects = index_json.get('objects', {})
+        self.names = sorted(objects.keys())
+        self.hashes = [objects[n]['hash'] for n in self.names]
+        self.sizes = array('Q', (objects[n]['size'] for n in self.names))
+        # the positions of the names in the order of the index
+        position = {n:i for i,n in enumerate(self.names)}
+        self.order = array('L', (position[n] for n in objects))
+        
+        # the other keys of the index (virtual, map_to_resources), objects is kept as a placeholder for the order
+        self.extra = {k:(None if k == 'objects' else v) for k,v in index_json.items()}
+    
+    @classmethod
+    def download(cls, assets, asset_index):
+        with urlopen(asset_index) as f:
+            return cls(assets, asset_index, json.load(f))
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def url(self, idx):
+        return asset_url(self.hashes[idx])
+    
+    def find(self, name):
+        from bisect import bisect_left
+        
+        idx = bisect_left(self.names, name)
+        if idx < len(self.names) and self.names[idx] == name:
+            return idx
+        return None
+    
+    def prefix_range(self, prefix):
+        from bisect import bisect_left
+        
+        start = bisect_left(self.names, prefix)
+        end = start
+        while end < len(self.names) and self.names[end].startswith(prefix):
+            end += 1
+        return range(start, end)
+    
+    def entries(self, idxs=None):
+        for idx in (range(len(self.names)) if idxs is None else idxs):
+            yield self.names[idx], self.hashes[idx], self.sizes[idx]
+    
+    def to_json(self, sort_objects=True, assets_url=None):
+        """
+        The index with the URL of each object, its objects sorted by name or else in the order of the index.
+        assets_url replace the ASSETS_URL in the URLs.
+        """
+        rslt = {'assets': self.assets, 'asset_index': self.asset_index}
+        extra = self.extra if 'objects' in self.extra else {**self.extra, 'objects': None}
+        for k,v in extra.items():
+            if k == 'objects':
+                url = assets_url or ASSETS_URL
+                v = {n:{'hash': h, 'size': s, 'url': url+h[0:2]+'/'+h} for n,h,s in self.entries(None if sort_objects else self.order)}
+            rslt[k] = v
+        return rslt
+
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_STORED_EXT = ('.png', '.ogg')
+
+def zip_write_raw(zip, zinfo, data, crc, file_size):
+    """
+    Write a entry with data already compressed with the zinfo.compress_type
+    
+    :type zip:          zipfile.ZipFile
+    :param zip:         ZIP open in write mode
+    :type data:         bytes
+    :param data:        compressed data of the entry
+    :type crc:          int
+    :param crc:         CRC-32 of the uncompressed data
+    :type file_size:    int
+    :param file_size:   size of the uncompressed data
+    """
+    zinfo.CRC = crc
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(data)
+    _zip_write_entry(zip, zinfo, [data])
+
+def zip_copy_raw(zip, src, item, chunk_size=2**20, arcname=None):
+    """
+    Copy a entry of a other ZIP without decompressing and recompressing it, the data is streamed by chunks
+    
+    :type zip:          zipfile.ZipFile
+    :param zip:         ZIP open in write mode
+    :type src:          file
+    :param src:         source ZIP file open in binary mode
+    :type item:         zipfile.ZipInfo
+    :param item:        entry of the source ZIP, it is not modified
+    :type chunk_size:   int
+    :param chunk_size:  size of the copied chunks
+    :type arcname:      string
+    :param arcname:     new name of the entry, default to the name in the source
+    """
+    import copy
+    import zipfile
+    
+    zinfo = copy.copy(item)
+    zinfo.flag_bits &= ~0x08 # the sizes are in the local header, no data descriptor
+    zinfo.extra = zipfile._strip_extra(item.extra, (1,)) # the zip64 extra is rebuild if needed
+    if arcname:
+        zinfo.filename = arcname
+        zinfo.orig_filename = arcname
+    _zip_write_entry(zip, zinfo, zip_read_raw(src, item, chunk_size))
+
+def zip_read_raw(src, item, chunk_size=2**20):
+    """
+    Iterate by chunks the compressed data of a entry, without decompressing it
+    
+    :type src:          file
+    :param src:         ZIP file open in binary mode
+    :type item:         zipfile.ZipInfo
+    :param item:        entry of the ZIP
+    :type chunk_size:   int
+    :param chunk_size:  size of the chunks
+    """
+    import struct
+    import zipfile
+    
+    src.seek(item.header_offset)
+    header = src.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[0:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f'Bad local header of {item.filename!r}')
+    name_len, extra_len = struct.unpack('<HH', header[26:30])
+    src.seek(item.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+    
+    remain = item.compress_size
+    while remain > 0:
+        data = src.read(min(chunk_size, remain))
+        if not data:
+            raise zipfile.BadZipFile(f'Truncated data of {item.filename!r}')
+        remain -= len(data)
+        yield data
+
+def _zip_write_entry(zip, zinfo, chunks):
+    import zipfile
+    
+    zinfo.header_offset = zip.fp.tell()
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zip.fp.write(zinfo.FileHeader(zip64))
+    for data in chunks:
+        zip.fp.write(data)
+    zip.filelist.append(zinfo)
+    zip.NameToInfo[zinfo.filename] = zinfo
+    zip.start_dir = zip.fp.tell()
+    zip._didModify = True
+
+def zip_compress_entry(name, data, compresslevel=6, stored_ext=ZIP_STORED_EXT) -> tuple[int, bytes, int, int]:
+    """
+    Compress the data of a ZIP entry for zip_write_raw(), return (compress_type, data, crc, file_size)
+    
+    The files with a extension in stored_ext, or that deflate doesn't make smaller, are stored as is.
+    """
+    import zipfile
+    import zlib
+    
+    crc = zlib.crc32(data)
+    if not name.lower().endswith(stored_ext):
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return zipfile.ZIP_DEFLATED, compressed, crc, len(data)
+    return zipfile.ZIP_STORED, data, crc, len(data)
+
+def make_zip_archive(zip_path, root_dir, compresslevel=6, stored_ext=ZIP_STORED_EXT, workers=None):
+    """
+    Empack the content of a folder in a deterministic ZIP file
+    
+    The entries are sorted and have a fixed timestamp. The folders have their own
+    entries, as with shutil.make_archive(). The files are deflated in parallel threads,
+    the files with a extension in stored_ext are stored as is.
+    
+    :type zip_path:         string
+    :param zip_path:        ZIP file to create
+    :type root_dir:         string
+    :param root_dir:        folder to empack
+    :type compresslevel:    int
+    :param compresslevel:   deflate level, 0 to 9
+    :type stored_ext:       tuple
+    :param stored_ext:      extensions of the already compressed files
+    :type workers:          int
+    :param workers:         number of threads, default to the number of CPU
+    """
+    import zipfile
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    
+    zip_abspath = os.path.abspath(zip_path)
+    names = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        for d in dirnames:
+            names.append(os.path.relpath(os.path.join(dirpath, d), root_dir).replace(os.sep, '/')+'/')
+        for f in filenames:
+            path = os.path.join(dirpath, f)
+            if os.path.abspath(path) != zip_abspath:
+                names.append(os.path.relpath(path, root_dir).replace(os.sep, '/'))
+    names.sort()
+    
+    def compress(name):
+        with open(os.path.join(root_dir, name), 'rb') as f:
+            return zip_compress_entry(name, f.read(), compresslevel, stored_ext)
+    
+    def write(zip, name, future):
+        zinfo = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+        zinfo.create_system = 3
+        if future is None:
+            # folder entry
+            zinfo.external_attr = (0o40755 << 16) | 0x10
+            zip_write_raw(zip, zinfo, b'', 0, 0)
+            return
+        zinfo.external_attr = 0o644 << 16
+        zinfo.compress_type, data, crc, file_size = future.result()
+        zip_write_raw(zip, zinfo, data, crc, file_size)
+    
+    workers = workers or os.cpu_count() or 1
+    make_dirname(zip_path)
+    with ThreadPoolExecutor(workers) as executor, zipfile.ZipFile(zip_path, mode='w') as zip:
+        pending = deque()
+        for name in names:
+            pending.append((name, None if name.endswith('/') else executor.submit(compress, name)))
+            if len(pending) >= workers*4:
+                write(zip, *pending.popleft())
+        while pending:
+            write(zip, *pending.popleft())
+
 
 def urlretrieve(url, filename, reporthook=None, data=None):
     from urllib import request
@@ -177,14 +1019,36 @@ def urlopen(url) :
 
 
 _VERSION_MANIFEST_PATH = os.path.join('version_manifest.json')
-VERSION_MANIFEST = read_json(_VERSION_MANIFEST_PATH, {'latest':{'release': None, 'snapshot': None}, 'versions':[], 'pack_format':{}, 'versioning':{}, 'versions_history':[]})
 
-LATEST_RELEASE = VERSION_MANIFEST.get('latest', {}).get('release')
-LATEST_SNAPSHOT = VERSION_MANIFEST.get('latest', {}).get('snapshot')
+def _version_manifest_mtime():
+    try:
+        return os.stat(_VERSION_MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def load_version_manifest(reload=False):
+    # the manifest is read at the first use, not at the import
+    # with reload, it is read again if the file has changed since (long running processes)
+    global VERSION_MANIFEST, LATEST_RELEASE, LATEST_SNAPSHOT
+    
+    if 'VERSION_MANIFEST' not in globals() or (reload and load_version_manifest.mtime != _version_manifest_mtime()):
+        load_version_manifest.mtime = _version_manifest_mtime()
+        VERSION_MANIFEST = read_json(_VERSION_MANIFEST_PATH, {'latest':{'release': None, 'snapshot': None}, 'versions':[], 'pack_format':{}, 'versioning':{}, 'versions_history':[]})
+        LATEST_RELEASE = VERSION_MANIFEST.get('latest', {}).get('release')
+        LATEST_SNAPSHOT = VERSION_MANIFEST.get('latest', {}).get('snapshot')
+    return VERSION_MANIFEST
+load_version_manifest.mtime = None
+
+def __getattr__(name):
+    if name in ['VERSION_MANIFEST', 'LATEST_RELEASE', 'LATEST_SNAPSHOT']:
+        load_version_manifest()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 def update_version_manifest():
     global VERSION_MANIFEST, LATEST_RELEASE, LATEST_SNAPSHOT
     
+    load_version_manifest()
     edited = not os.path.exists(_VERSION_MANIFEST_PATH)
     _init_release = VERSION_MANIFEST['latest']['release']
     _init_snapshot = VERSION_MANIFEST['latest']['snapshot']
@@ -277,12 +1141,14 @@ def update_version_manifest():
         print('INFO: version_manifest.json has been updated')
         write_json(_VERSION_MANIFEST_PATH, VERSION_MANIFEST)
     
+    load_version_manifest.mtime = _version_manifest_mtime()
     VERSION_MANIFEST = read_json(_VERSION_MANIFEST_PATH)
     LATEST_RELEASE = VERSION_MANIFEST.get('latest', {}).get('release')
     LATEST_SNAPSHOT = VERSION_MANIFEST.get('latest', {}).get('snapshot')
 
 
 def version_path(version):
+    load_version_manifest()
     for k,v in VERSION_MANIFEST['versioning'].items():
         if isinstance(v, list):
             if version in v:
@@ -299,6 +1165,7 @@ def version_path(version):
 
 def version_developement(version):
     # get the version cycle of a snapshot
+    load_version_manifest()
     for k,v in VERSION_MANIFEST['versioning'].items():
         if isinstance(v, list):
             if version in v:
@@ -324,6 +1191,7 @@ def get_latest(version, manifest_json_path=None):
     if manifest_json_path:
         return read_json(manifest_json_path, {'id': None})['id']
     
+    load_version_manifest()
     if version in ['r','release']:
         return LATEST_RELEASE
     if version in ['s','snapshot', 'l', 'latest']:
@@ -337,6 +1205,7 @@ def valide_version(version, quiet = False, manifest_json_path = None):
         return read_json(manifest_json_path, {'id': None})['id']
     
     else:
+        load_version_manifest()
         if not version:
             if quiet:
                 print('No version or "manifest_json.json" are declared. One of them are require in quiet mode.')
@@ -368,6 +1237,7 @@ def valide_output(args):
 def read_manifest_json(temp, version, manifest_json_path = None):
     import zipfile
     
+    load_version_manifest()
     manifest_url = None
     for v in VERSION_MANIFEST['versions']:
         if v['id'] == version and v['url']:
@@ -419,6 +1289,7 @@ def serialize_nbt(file, output_file=None):
 
 
 def info_latest_version():
+    load_version_manifest()
     for v in VERSION_MANIFEST['versions']:
         if v['id'] == LATEST_SNAPSHOT:
             latest = v
@@ -1,13 +1,20 @@
+import argparse
+import copy
 import os
 import glob
+import json
 import unicodedata
 import re
 import zipfile
-from tempfile import gettempdir
 
-from common import read_json, safe_del
+from common import run_jobs, safe_del, zip_compress_entry, zip_copy_raw, zip_read_raw, zip_write_raw
 
-temp = os.path.join(gettempdir(), 'package_datapack_to_mod')
+parser = argparse.ArgumentParser()
+parser.add_argument('path', help='Datapacks (folder or zip) to package.', nargs='*')
+parser.add_argument('-u', '--update', help='Update the mod/zip already inside a datapack folder.', action='store_true', default=None)
+parser.add_argument('--no-update', dest='update', help='Never update the mod/zip inside a datapack folder.', action='store_false')
+parser.add_argument('-i', '--incremental', help='Overwrite the existing zip/jar, reusing the compressed files of the zip that didn\'t changed.', action='store_true')
+parser.add_argument('-j', '--jobs', help='Number of datapacks packaged in parallel when --update or --no-update is set (default: number of CPU)', type=int)
 
 def slugify(value, allow_unicode=False):
     """
@@ -66,10 +73,68 @@ fabric = """{{"schemaVersion":1,"id":"{id}_pdpm","version":"1-mcmeta-{mcmeta}","
 
 quilt = """{{"schema_version":1,"quilt_loader":{{"group": "net.pdpm","id":"{id}_pdpm","version":"1-mcmeta-{mcmeta}","metadata":{{"name":"{name}","description":"{description}","icon":"{id}_pack.png"}},"intermediate_mappings":"net.fabricmc:intermediary","depends":[{{"id":"quilt_resource_loader","versions":"*","unless":"fabric-resource-loader-v0"}}]}}}}"""
 
-def package_datapack(path):
-    safe_del(temp)
-    safe_del(temp+'.zip')
-    os.makedirs(temp, exist_ok=True)
+def read_pack_mcmeta(data) -> tuple[str, str]:
+    # return the pack format (or the range of supported formats) and the description
+    j = json.loads(data)
+    mcmeta = j['pack']['pack_format']
+    range_formats = j['pack'].get('supported_formats')
+    if isinstance(range_formats, dict):
+        range_formats = [range_formats['min_inclusive'], range_formats['max_inclusive']]
+    if isinstance(range_formats, list):
+        mcmeta = f'{range_formats[0]}-{range_formats[1]}'
+    description = j['pack'].get('description', '')
+    if isinstance(description, list):
+        for i in range(len(description)):
+            if isinstance(description[i], dict):
+                description[i] = description[i].get('text', '')
+        
+        description = ''.join(description).replace('\r\n','\n')
+    return mcmeta, description
+
+def write_mod_metadata(jar, id, name, mcmeta, description):
+    map = {'id': id, 'mcmeta': mcmeta, 'name': name, 'description': description.replace('\n', '\\n').replace('"', '\\"')}
+    jar.writestr('META-INF/mods.toml', forge.format(**map))
+    jar.writestr('META-INF/neoforge.mods.toml', neoforge.format(**map))
+    jar.writestr('fabric.mod.json', fabric.format(**map))
+    jar.writestr('quilt.mod.json', quilt.format(**map))
+    # fc = id.encode('utf-8').join(forge_class)
+    # jar.writestr(f'net/pdpm/{id}/pdpmWrapper.class', fc)
+
+def has_inner_outputs(path) -> bool:
+    # a datapack folder that already contains its mod/zip
+    inner = os.path.join(path, os.path.basename(path))
+    return os.path.exists(inner+'.jar') or os.path.exists(inner+'.zip')
+
+def datapack_outputs(path, update_jar=False) -> tuple[str, str]:
+    """
+    Return the (jar, zip) paths written by package_datapack(), the zip is the datapack itself for a zip datapack
+    """
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        if update_jar and has_inner_outputs(path):
+            path = os.path.join(path, os.path.basename(path))
+        return path+'.jar', path+'.zip'
+    return os.path.splitext(path)[0]+'.jar', path
+
+def package_datapack(path, update_jar=None, incremental=False):
+    """
+    Package a datapack (folder or zip) into a mod jar for Forge, NeoForge, Fabric and Quilt
+    
+    The outputs are built in a temp folder of the job and moved at the end, so many jobs can run at the same time.
+    Return the path of the jar, or None if it failed.
+    
+    :type path:         string
+    :param path:        datapack folder or zip
+    :type update_jar:   bool
+    :param update_jar:  update the mod/zip with the same name already inside a datapack folder, None to ask it
+    :type incremental:  bool
+    :param incremental: overwrite the existing outputs, the files of a folder with the same size, mtime or CRC
+                        as in the existing zip reuse its compressed data
+    """
+    import shutil
+    import tempfile
+    import zlib
+    
     path = os.path.abspath(path)
     
     if not os.path.exists(path):
@@ -79,32 +144,21 @@ def package_datapack(path):
     if os.path.isdir(path):
         is_folder = True
         name = os.path.basename(path)
-        _path_jar = os.path.join(path, name)+'.jar'
-        _path_zip = os.path.join(path, name)+'.zip'
-        update_jar = False
-        if os.path.exists(_path_jar) or os.path.exists(_path_zip):
+        if not has_inner_outputs(path):
+            update_jar = False
+        elif update_jar is None:
             print('The target folder already have a mod/zip with the same name.')
             print('Do you want update this one?')
             update_jar = input().lower().startswith('y')
-        
-        if update_jar:
-            path_jar = _path_jar
-            path_zip = _path_zip
-        else:
-            path_jar = os.path.abspath(path)+'.jar'
-            path_zip = os.path.abspath(path)+'.zip'
-        
     else:
         is_folder = False
         update_jar = False
         name = os.path.splitext(os.path.basename(path))[0]
-        path_jar = os.path.splitext(path)[0]+'.jar'
-        path_zip = os.path.splitext(path)[0]+'.zip'
+    path_jar, path_zip = datapack_outputs(path, update_jar)
     
-    if (
-        is_folder and not update_jar and (os.path.exists(path_jar), os.path.exists(path_zip))
-        ) or (
-        not is_folder and os.path.exists(path_jar)
+    if not incremental and (
+        (is_folder and not update_jar and (os.path.exists(path_jar) or os.path.exists(path_zip)))
+        or (not is_folder and os.path.exists(path_jar))
         ):
         print('Error: packaged Datapack already exist {!r}'.format(os.path.basename(path_jar)))
         return None
@@ -113,64 +167,164 @@ def package_datapack(path):
     id = re.sub(r'^([0-9])',r'n\1', id)
     id = re.sub(r'^([^\w])',r'a\1', id)
     
-    if is_folder:
-        print('Building zip...')
-        with zipfile.ZipFile(path_zip, mode='w') as zip:
-            for f in glob.iglob('**/*', recursive=True, root_dir=path):
-                if f.lower().endswith(('.zip', '.jar')):
-                    continue
-                if not os.path.isfile(os.path.join(path, f)):
-                    continue
-                zip.write(os.path.join(path, f), f)
-    
-    print('Writing metadata...')
+    temp = tempfile.mkdtemp(prefix='package_datapack_to_mod_')
     try:
-        j = read_json(os.path.join(path, 'pack.mcmeta'))
-        mcmeta = j['pack']['pack_format']
-        range_formats = j['pack'].get('supported_formats')
-        if isinstance(range_formats, dict):
-            range_formats = [range_formats['min_inclusive'], range_formats['max_inclusive']]
-        if isinstance(range_formats, list):
-            mcmeta = f'{range_formats[0]}-{range_formats[1]}'
-        description = j['pack'].get('description', '')
-        if isinstance(description, list):
-            for i in range(len(description)):
-                if isinstance(description[i], dict):
-                    description[i] = description[i].get('text', '')
+        temp_zip = os.path.join(temp, 'datapack.zip')
+        temp_jar = os.path.join(temp, 'mod.jar')
+        
+        if is_folder:
+            # each file is read and compressed once, then written raw in the zip and in the jar
+            print('Building zip and jar...')
+            old = {}
+            old_zip = None
+            if incremental and os.path.exists(path_zip):
+                old_zip = zipfile.ZipFile(path_zip, mode='r')
+                old_src = open(path_zip, 'rb')
+                old = old_zip.NameToInfo
+            
+            def read_file(file):
+                with open(file, 'rb') as fi:
+                    return fi.read()
             
-            description = ''.join(description).replace('\r\n','\n')
+            with zipfile.ZipFile(temp_zip, mode='w') as zip, zipfile.ZipFile(temp_jar, mode='w', compression=zipfile.ZIP_DEFLATED) as jar:
+                mcmeta_data = None
+                logo = None
+                reused = 0
+                for f in glob.iglob('**/*', recursive=True, root_dir=path):
+                    if f.lower().endswith(('.zip', '.jar')):
+                        continue
+                    file = os.path.join(path, f)
+                    if not os.path.isfile(file):
+                        continue
+                    zinfo = zipfile.ZipInfo.from_file(file, f)
+                    data = None
+                    if zinfo.filename == 'pack.mcmeta':
+                        data = mcmeta_data = read_file(file)
+                    
+                    # same size and mtime (2 seconds precision in a ZIP), or else same CRC: the compressed data is reused
+                    entry = None
+                    item = old.get(zinfo.filename)
+                    if item and item.file_size == zinfo.file_size and not item.flag_bits & 0x01:
+                        if item.date_time[:5] != zinfo.date_time[:5] or item.date_time[5]//2 != zinfo.date_time[5]//2:
+                            if data is None:
+                                data = read_file(file)
+                            if zlib.crc32(data) != item.CRC:
+                                item = None
+                        if item:
+                            entry = item.compress_type, b''.join(zip_read_raw(old_src, item)), item.CRC, item.file_size
+                            reused += 1
+                    if not entry:
+                        entry = zip_compress_entry(zinfo.filename, read_file(file) if data is None else data)
+                    
+                    zinfo.compress_type, data, crc, file_size = entry
+                    if zinfo.filename == 'pack.png':
+                        logo = zinfo, data, crc, file_size
+                    zip_write_raw(zip, zinfo, data, crc, file_size)
+                    zip_write_raw(jar, copy.copy(zinfo), data, crc, file_size)
+                
+                if old_zip:
+                    old_src.close()
+                    old_zip.close()
+                    print(f'{reused} unchanged files reused from the previous zip')
+                
+                print('Writing metadata...')
+                try:
+                    mcmeta, description = read_pack_mcmeta(mcmeta_data)
+                except:
+                    print('Error: invalide Datapack')
+                    return None
+                
+                if logo:
+                    zinfo, data, crc, file_size = logo
+                    zinfo = copy.copy(zinfo)
+                    zinfo.filename = zinfo.orig_filename = f'{id}_pack.png'
+                    zip_write_raw(jar, zinfo, data, crc, file_size)
+                write_mod_metadata(jar, id, name, mcmeta, description)
         
-    except:
-        print('Error: invalide Datapack')
+        else:
+            # the jar is the zip with the loaders metadata, its entries are copied without recompressing them
+            print('Writing metadata...')
+            with zipfile.ZipFile(path_zip, mode='r') as zin:
+                try:
+                    mcmeta, description = read_pack_mcmeta(zin.read('pack.mcmeta'))
+                except:
+                    print('Error: invalide Datapack')
+                    return None
+                
+                with open(path_zip, 'rb') as src, zipfile.ZipFile(temp_jar, mode='w', compression=zipfile.ZIP_DEFLATED) as jar:
+                    jar.comment = zin.comment
+                    for item in zin.infolist():
+                        zip_copy_raw(jar, src, item)
+                    if 'pack.png' in zin.NameToInfo:
+                        zip_copy_raw(jar, src, zin.getinfo('pack.png'), arcname=f'{id}_pack.png')
+                    write_mod_metadata(jar, id, name, mcmeta, description)
+        
+        if is_folder:
+            safe_del(path_zip)
+            shutil.move(temp_zip, path_zip)
+        safe_del(path_jar)
+        shutil.move(temp_jar, path_jar)
+        return path_jar
+    
+    finally:
+        safe_del(temp)
+
+def _package_datapack_job(path, update_jar, incremental):
+    # a failed datapack doesn't abort the others of the batch
+    try:
+        return package_datapack(path, update_jar, incremental)
+    except Exception as ex:
+        print('{}: {}'.format(path, ex))
         return None
+
+def package_datapacks(paths, update_jar=False, incremental=False) -> dict[str, str|None]:
+    """
+    Package many datapacks without any user interaction, in a process pool (see run_jobs)
     
-    with open(path_zip, 'rb') as fi:
-        with open(path_jar, 'wb') as fo:
-            while (b := fi.read(2**16)):
-                fo.write(b)
+    The datapacks whose outputs are written or read by another one (like 'X/' and 'X.zip' that both write 'X.jar')
+    are packaged one after another once the pool is done, in the given order.
     
-    map = {'id': id, 'mcmeta': mcmeta, 'name': name, 'description': description.replace('\n', '\\n').replace('"', '\\"')}
+    Return {datapack path: jar path, or None if it failed}, the error of a failed datapack is printed
+    """
+    written = []
+    used = []
+    for p in paths:
+        path_jar, path_zip = datapack_outputs(p, update_jar)
+        written.append({path_jar, path_zip} if os.path.isdir(p) else {path_jar})
+        used.append(written[-1] | {os.path.abspath(p)})
+    
+    writers = {}
+    users = {}
+    for i in range(len(paths)):
+        for f in written[i]:
+            writers.setdefault(f, set()).add(i)
+        for f in used[i]:
+            users.setdefault(f, set()).add(i)
+    serial = [i for i in range(len(paths)) if
+        any(users[f] - {i} for f in written[i]) or any(writers.get(f, set()) - {i} for f in used[i])
+    ]
+    parallel = [i for i in range(len(paths)) if i not in serial]
     
-    with zipfile.ZipFile(path_jar, mode='a') as zip:
-        if 'pack.png' in zip.namelist():
-            zip.writestr(f'{id}_pack.png', zip.open('pack.png').read())
-        zip.writestr('META-INF/mods.toml', forge.format(**map))
-        zip.writestr('META-INF/neoforge.mods.toml', neoforge.format(**map))
-        zip.writestr('fabric.mod.json', fabric.format(**map))
-        zip.writestr('quilt.mod.json', quilt.format(**map))
-        # fc = id.encode('utf-8').join(forge_class)
-        # zip.writestr(f'net/pdpm/{id}/pdpmWrapper.class', fc)
+    rslt = dict(zip(parallel, run_jobs(_package_datapack_job, [(paths[i], update_jar, incremental) for i in parallel])))
+    for i in serial:
+        print('Packaged alone, same outputs as another datapack: '+paths[i])
+        rslt[i] = _package_datapack_job(paths[i], update_jar, incremental)
+    return {paths[i]: rslt[i] for i in range(len(paths))}
 
 
 if __name__ == "__main__":
-    import sys
+    args = parser.parse_args()
+    run_jobs.jobs = args.jobs
     
     print('{|[ Package Datapack to mod ]|}')
-    args = sys.argv[1:]
-    if args:
-        for a in args:
+    if args.path and args.update is not None:
+        for a, jar in package_datapacks(args.path, args.update, args.incremental).items():
+            print('>> '+os.path.basename(a), '>', os.path.basename(jar) if jar else 'failed')
+    
+    elif args.path:
+        for a in args.path:
             print('>> '+os.path.basename(a))
-            package_datapack(a)
+            package_datapack(a, incremental=args.incremental)
             print()
     
     else:
@@ -1,89 +1,156 @@
 import argparse
+import copy
+import glob
 import json
 import os.path
 import pathlib
+import re
 import zipfile
 
+from common import read_lines, write_json, zip_copy_raw
+
 parser = argparse.ArgumentParser()
-parser.add_argument('-s', '--seed', help='Seed to set', required=False)
-parser.add_argument('datapack', help='Target Worldgen datapack.', type=pathlib.Path)
+parser.add_argument('-s', '--seed', help='Seed to set, can be repeated to make a datapack for each seed', action='append')
+parser.add_argument('--seeds-file', help='Text file with a seed to set by line', type=pathlib.Path)
+parser.add_argument('-j', '--jobs', help='Number of datapacks written in parallel (default: number of CPU)', type=int)
+parser.add_argument('--summary', help='Write a JSON summary of the seeded datapacks in this file', type=pathlib.Path)
+parser.add_argument('datapack', help='Target Worldgen datapacks, a glob pattern or a folder of ZIP datapacks.', nargs='*')
 args = parser.parse_args()
 
+def is_seeded_output(path, zips) -> bool:
+    """
+    A '<stem>-<seed>.zip' written by a previous run, when '<stem>.zip' is among the zips next to it
+    """
+    match = re.fullmatch(r'(.+?)-(-?\d+)\.zip', path)
+    return bool(match) and match[1]+'.zip' in zips
+
+def expand_datapacks(paths) -> list[str]:
+    """
+    The folders are replaced by their ZIP files and the glob patterns by their matches,
+    without the datapacks already seeded by a previous run
+    """
+    rslt = []
+    for path in paths:
+        if os.path.isdir(path) or glob.has_magic(path):
+            if os.path.isdir(path):
+                matches = sorted(glob.glob(os.path.join(glob.escape(path), '*.zip')))
+            else:
+                matches = sorted(glob.glob(path))
+            matches_set = set(matches)
+            rslt.extend(p for p in matches if not is_seeded_output(p, matches_set))
+        else:
+            rslt.append(path)
+    return list(dict.fromkeys(rslt))
+
+def read_dimensions(datapack) -> tuple[list[zipfile.ZipInfo], bytes, dict[str, dict]]:
+    """Read the central directory and the dimensions with a seed of the datapack, to reuse them for each seed"""
+    dimensions = {}
+    with zipfile.ZipFile(datapack, mode='r') as zip:
+        for file in zip.filelist:
+            if file.filename.startswith('data/minecraft/dimension') and os.path.splitext(file.filename)[1] == '.json':
+                with zip.open(file) as zi:
+                    dimension = json.load(zi)
+                
+                if dimension.get('generator', {}).get('seed', None) != None:
+                    dimensions[file.filename] = dimension
+        
+        return zip.infolist(), zip.comment, dimensions
+
+def write_seeded_datapack(datapack, infolist, comment, dimensions, seed) -> str:
+    datapack_out = os.path.splitext(datapack)[0] +'-'+ str(seed) +'.zip'
+    
+    with open(datapack, 'rb') as src, zipfile.ZipFile(datapack_out, 'w') as zout:
+        zout.comment = comment # preserve the comment
+        for item in infolist:
+            if item.filename in dimensions:
+                # shallow copies, the parsed dimensions are shared between the seeds
+                dimension = dict(dimensions[item.filename])
+                dimension['generator'] = dict(dimension['generator'])
+                dimension['generator']['seed'] = seed
+                zout.writestr(copy.copy(item), json.dumps(dimension, indent=2, ensure_ascii=False).encode('utf-8'))
+            else:
+                zip_copy_raw(zout, src, item)
+    
+    return datapack_out
+
 def main():
+    from concurrent.futures import ThreadPoolExecutor
+    
     print(f'--==| Minecraft: Datapack Seeder |==--')
     print('         for 1.16.2 to 1.18.2')
     print()
     
-    datapack = None
-    seed = None
+    if args.seeds_file:
+        args.seed = (args.seed or []) + [l.strip() for l in read_lines(args.seeds_file) if l.strip() and not l.strip().startswith('#')]
     
     if not args.datapack:
         print('Enter a ZIP datapack:')
         datapack = input()
         if datapack[0] == '"' and datapack[-1] == '"':
             datapack = datapack.strip('"')
+        datapacks = [datapack]
         
     else:
-        datapack = args.datapack
+        datapacks = expand_datapacks(args.datapack)
+        if not datapacks:
+            print('No datapack found for', ', '.join(f'"{d}"' for d in args.datapack))
+            return -1
     
-    msg = None
-    if not os.path.exists(datapack):
-        msg = 'the path does\'t exist.'
-    if not os.path.isfile(datapack):
-        msg = 'it not a file.'
-    if not zipfile.is_zipfile(datapack):
-        msg = 'is not a ZIP.'
-    
-    if msg:
-        print('Invalide target datapack,', msg)
-        return -1
+    for datapack in datapacks:
+        msg = None
+        if not os.path.exists(datapack):
+            msg = 'the path does\'t exist.'
+        if not os.path.isfile(datapack):
+            msg = 'it not a file.'
+        if not zipfile.is_zipfile(datapack):
+            msg = 'is not a ZIP.'
+        
+        if msg:
+            print(f'Invalide target datapack "{datapack}",', msg)
+            return -1
     
     if args.seed == None and not args.datapack:
         print('Enter a seed (blanck to random):')
-        args.seed = input()
-        if not args.seed.strip(): args.seed = None
+        seed = input()
+        if seed.strip(): args.seed = [seed]
     
     if args.seed == None:
         import random
         
-        args.seed = random.getrandbits(64)
-        print('Random seed generated:', str(args.seed))
+        args.seed = [random.getrandbits(64)]
+        print('Random seed generated:', str(args.seed[0]))
     
-    seed = args.seed
-    if isinstance(seed, str):
-        try:
-            seed = int(seed.strip())
-        except:
-            print('Invalid seed, must be a integer.')
+    seeds = []
+    for seed in args.seed:
+        if isinstance(seed, str):
+            try:
+                seed = int(seed.strip())
+            except:
+                print(f'Invalid seed "{seed}", must be a integer.')
+                return -1
+        seeds.append(seed)
+    seeds = list(dict.fromkeys(seeds))
     
-    datapack_out = os.path.splitext(datapack)[0] +'-'+ str(seed) +'.zip'
-    dimensions = {}
+    jobs = []
+    summary = {}
+    for datapack in datapacks:
+        infolist, comment, dimensions = read_dimensions(datapack)
+        summary[datapack] = {'dimensions': list(dimensions.keys()), 'seeds': {}}
+        if dimensions:
+            jobs.extend((datapack, infolist, comment, dimensions, seed) for seed in seeds)
+        else:
+            print(f'The "{datapack}" datapack has no world seed to edit.')
     
-    with zipfile.ZipFile(datapack, mode='r') as zip:
-        for file in zip.filelist:
-            if file.filename.startswith('data/minecraft/dimension') and os.path.splitext(file.filename)[1] == '.json':
-                with zip.open(file) as zi:
-                    dimension = json.load(zi)
-                
-                old_seed = dimension.get('generator', {}).get('seed', None)
-                
-                if old_seed != None:
-                    dimension['generator']['seed'] = seed
-                    dimensions[file.filename] = json.dumps(dimension, indent=2, ensure_ascii=False)
+    with ThreadPoolExecutor(args.jobs or os.cpu_count() or 1) as executor:
+        for (datapack, _infolist, _comment, _dimensions, seed), datapack_out in zip(jobs, executor.map(lambda job: write_seeded_datapack(*job), jobs)):
+            summary[datapack]['seeds'][str(seed)] = datapack_out
+            print(f'The Worldgen datapack "{datapack}" has now set to {seed} seed.')
     
-    if dimensions:
-        with zipfile.ZipFile(datapack, 'r') as zin:
-            with zipfile.ZipFile(datapack_out, 'w') as zout:
-                zout.comment = zin.comment # preserve the comment
-                for item in zin.infolist():
-                    if item.filename in dimensions:
-                        zout.writestr(item, dimensions[item.filename].encode('utf-8'))
-                    else:
-                        zout.writestr(item, zin.read(item.filename))
-        
-        print(f'The Worldgen datapack "{datapack}" has now set to {seed} seed.')
-    else:
-        print(f'The "{datapack}" datapack has no world seed to edit.')
+    if args.summary:
+        write_json(args.summary, {
+            'seeds': [str(s) for s in seeds],
+            'datapacks': [{'datapack': k, 'seeded': bool(v['seeds']), **v} for k,v in summary.items()],
+        })
 
 if __name__ == "__main__":
     main()
@@ -2,13 +2,16 @@ import argparse
 import glob
 import os.path
 import pathlib
+import sys
 from collections import OrderedDict, defaultdict
+from json.encoder import encode_basestring_ascii
 from typing import Callable
 
 from common import (
-    find_output, get_latest, version_path, hash_test, make_dirname,
-    read_manifest_json, run_animation, safe_del, urlretrieve, urlopen,
-    read_json, read_lines, read_text, write_json, write_lines, write_text,
+    AssetIndex, download_assets, find_output, get_latest, load_version_manifest, version_path, hash_test, iter_json_items,
+    make_zip_archive, place_output, read_manifest_json, run_animation, run_jobs, safe_del, urlretrieve,
+    hash_tree, normalize_newlines, read_json, read_lines, read_text, touch, write_json, write_json_items, write_lines,
+    write_text,
 )
 
 VERSION = (0, 35, 2)
@@ -21,9 +24,22 @@ parser.add_argument('-f', '--overwrite', help='Overwrite on the existing output
 
 parser.add_argument('-z', '--zip', help='Empack the folder in a zip after it\'s creation', action='store_true', default=None)
 parser.add_argument('--no-zip', dest='zip', help='Don\'t ask for empack the folder in a zip', action='store_false')
+parser.add_argument('--zip-level', help='Compression level of the zip, 0 to 9 (default: 6)', type=int, choices=range(10), default=6)
 
 parser.add_argument('-o', '--output', help='Output folder', type=pathlib.Path)
 parser.add_argument('--manifest-json', help='Local JSON manifest file of the target version.', type=pathlib.Path)
+parser.add_argument('--no-update-check', help='Don\'t check online for new versions of Minecraft and of the builder, use the local version_manifest.json.', action='store_true')
+parser.add_argument('-j', '--jobs', help='Number of worker processes/threads (default: number of CPU)', type=int)
+parser.add_argument('--diff', help='Compare two built versions (version id or folder) and write the report in the "changes" folder of NEW.', nargs=2, metavar=('OLD', 'NEW'))
+
+parser.add_argument('--serve', help='Run as a daemon that builds the jobs submitted on the local port.', action='store_true')
+parser.add_argument('--concurrency', help='Number of builds run at the same time by the daemon (default: 1)', type=int, default=1)
+parser.add_argument('--submit', help='Submit the build to the daemon instead of running it.', action='store_true')
+parser.add_argument('--status', help='Show the status of the daemon jobs, or of the given job id.', nargs='?', const='', default=None)
+parser.add_argument('--wait', help='With --submit, wait for the end of the job.', action='store_true')
+parser.add_argument('--port', help='Local port of the daemon (default: 8765)', type=int, default=8765)
+parser.add_argument('--token-file', help='File of the daemon access token, written by the daemon and read by the client (default: in the temp folder, by port)', type=pathlib.Path)
+parser.add_argument('--allow-output', help='With --serve, folder outside the current folder where the jobs can write, can be repeated.', action='append', type=pathlib.Path)
 
 def parse_args():
     return parser.parse_args()
@@ -31,15 +47,29 @@ def parse_args():
 def main(args):
     from common import GITHUB_BUILDER, update_version_manifest, valide_output, valide_version, work_done
     
-    update_version_manifest()
+    if args.submit or args.status is not None:
+        return submit(args)
+    
+    if not args.no_update_check:
+        update_version_manifest()
+    run_jobs.jobs = args.jobs
     
     print(f'--==| Minecraft: Generated data builder {VERSION} |==--')
     print()
     
-    last, _versions, _versions_info = GITHUB_BUILDER.check_releases()
-    if last > VERSION:
-        print('A new version is available!')
-        print()
+    if not args.no_update_check:
+        last, _versions, _versions_info = GITHUB_BUILDER.check_releases()
+        if last > VERSION:
+            print('A new version is available!')
+            print()
+    
+    if args.serve:
+        return serve(args)
+    
+    if args.diff:
+        error = diff_generated_data(*args.diff)
+        work_done(error, args.quiet)
+        return error
     
     args.version = valide_version(args.version, args.quiet, args.manifest_json)
     
@@ -59,8 +89,267 @@ def main(args):
     return error
 
 
+JOB_OPTIONS = ['version', 'zip', 'zip_level', 'overwrite', 'output', 'manifest_json', 'jobs']
+
+def daemon_token_file(args) -> str:
+    from tempfile import gettempdir
+    
+    return str(args.token_file or os.path.join(gettempdir(), f'mc_generated_data_daemon_{args.port}.token'))
+
+def daemon_request(args, method, path, data=None):
+    import json
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+    
+    token = read_text(daemon_token_file(args)).strip()
+    if data is not None:
+        data = json.dumps(data).encode('utf-8')
+    headers = {'Content-Type': 'application/json', 'Authorization': 'Bearer '+token}
+    request = Request(f'http://127.0.0.1:{args.port}{path}', data=data, method=method, headers=headers)
+    try:
+        with urlopen(request) as response:
+            return json.load(response)
+    except HTTPError as ex:
+        return json.load(ex)
+
+def print_job(job):
+    print(f"{job['id']}: {job['version']} {job['status']}", f"({job['error']})" if job['error'] else '')
+
+def submit(args):
+    """Thin client of the daemon: submit a build, or show the status of the jobs"""
+    import time
+    
+    if not os.path.exists(daemon_token_file(args)):
+        print(f'No daemon token at "{daemon_token_file(args)}", is the daemon running?')
+        return -1
+    
+    if args.status is not None:
+        rslt = daemon_request(args, 'GET', f'/jobs/{args.status}' if args.status else '/jobs')
+        if 'error' in rslt and 'id' not in rslt:
+            print(rslt['error'])
+            return -1
+        for job in rslt if isinstance(rslt, list) else [rslt]:
+            print_job(job)
+        if isinstance(rslt, dict) and rslt['status'] == 'failed':
+            return -1
+        return
+    
+    options = {k:getattr(args, k) for k in JOB_OPTIONS}
+    for k in ['output', 'manifest_json']:
+        if options[k]:
+            options[k] = os.path.abspath(options[k])
+    
+    job = daemon_request(args, 'POST', '/jobs', options)
+    if 'id' not in job:
+        print(job['error'])
+        return -1
+    print_job(job)
+    
+    while args.wait and job['status'] in ['queued', 'running']:
+        time.sleep(2)
+        job = daemon_request(args, 'GET', f"/jobs/{job['id']}")
+        print_job(job)
+    
+    if job['status'] == 'failed':
+        return -1
+
+def run_job(options, manifest_mtime):
+    # executed in the daemon workers, the imported modules and the manifest stay loaded between the jobs
+    args = parser.parse_args([])
+    for k,v in options.items():
+        setattr(args, k, v)
+    args.quiet = True
+    if args.zip is None:
+        args.zip = False
+    run_jobs.jobs = args.jobs
+    # reloaded only when the daemon has updated the manifest since the last job
+    if manifest_mtime != load_version_manifest.mtime:
+        load_version_manifest(reload=True)
+    return build_generated_data(args)
+
+MANIFEST_UPDATE_DELAY = 60
+
+def serve(args):
+    """Run the builder as a daemon: the jobs submitted by HTTP on 127.0.0.1 are queued and built by a pool of workers"""
+    import hmac
+    import json
+    import secrets
+    import threading
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    import common
+    from common import update_version_manifest
+    
+    jobs = OrderedDict()
+    condition = threading.Condition()
+    concurrency = max(1, args.concurrency)
+    pool = ProcessPoolExecutor(max_workers=concurrency)
+    manifest_lock = threading.Lock()
+    manifest_updated = time.monotonic()
+    
+    def public(job):
+        return {k:v for k,v in job.items() if k != 'options'}
+    
+    def update_manifest():
+        # a version released after the start of the daemon, at most one update by MANIFEST_UPDATE_DELAY
+        nonlocal manifest_updated
+        if args.no_update_check:
+            return
+        with manifest_lock:
+            if time.monotonic() - manifest_updated < MANIFEST_UPDATE_DELAY:
+                return
+            manifest_updated = time.monotonic()
+            try:
+                update_version_manifest()
+            except Exception as ex:
+                print('Imposible to update the version_manifest.json:', repr(ex))
+    
+    def find_version(version):
+        version = get_latest(version)
+        # common.VERSION_MANIFEST is replaced by update_version_manifest()
+        if any(v['id'] == version and v['url'] for v in common.VERSION_MANIFEST['versions']):
+            return version
+        return None
+    
+    # the jobs can only write in the current folder or in the folders allowed by the operator
+    output_roots = [os.path.realpath(r) for r in ['.'] + (args.allow_output or [])]
+    
+    def add_job(options):
+        options = {k:options.get(k, getattr(args, k)) for k in JOB_OPTIONS}
+        if options['output']:
+            output = os.path.realpath(options['output'])
+            if not any(os.path.commonpath([output, r]) == r for r in output_roots):
+                raise ValueError(f"The output \"{options['output']}\" is outside the allowed folders.")
+        if not options['manifest_json']:
+            if options['version'] in ['r', 'release', 's', 'snapshot', 'l', 'latest']:
+                update_manifest()
+            version = find_version(options['version'])
+            if not version:
+                update_manifest()
+                version = find_version(options['version'])
+            if not version:
+                raise ValueError(f"The version {get_latest(options['version'])} has invalide.")
+            options['version'] = version
+        else:
+            options['version'] = get_latest(None, options['manifest_json'])
+        
+        with condition:
+            job = {
+                'id': str(len(jobs)+1),
+                'version': options['version'],
+                'status': 'queued',
+                'error': None,
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+                'options': options,
+            }
+            jobs[job['id']] = job
+            condition.notify_all()
+        return job
+    
+    def job_done(job, future):
+        with condition:
+            job['finished'] = time.time()
+            try:
+                error = future.result()
+            except BaseException as ex:
+                error = repr(ex)
+            if error:
+                job['status'] = 'failed'
+                job['error'] = str(error)
+            else:
+                job['status'] = 'done'
+            condition.notify_all()
+    
+    def dispatch():
+        # two jobs of the same version share the same temp folder, they are never run together
+        while True:
+            with condition:
+                while True:
+                    running = {j['version'] for j in jobs.values() if j['status'] == 'running'}
+                    job = None
+                    if len(running) < concurrency:
+                        job = next((j for j in jobs.values() if j['status'] == 'queued' and j['version'] not in running), None)
+                    if job:
+                        break
+                    condition.wait()
+                job['status'] = 'running'
+                job['started'] = time.time()
+            pool.submit(run_job, job['options'], common.load_version_manifest.mtime).add_done_callback(lambda f, job=job: job_done(job, f))
+    
+    class Handler(BaseHTTPRequestHandler):
+        def reply(self, code, obj):
+            data = json.dumps(obj).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def authorized(self):
+            # a custom header can't be sent cross-origin without a CORS preflight, which is never accepted
+            if hmac.compare_digest(self.headers.get('Authorization', ''), 'Bearer '+token):
+                return True
+            self.reply(401, {'error': 'Invalid or missing daemon token.'})
+            return False
+        
+        def do_GET(self):
+            if not self.authorized():
+                return
+            path = self.path.strip('/').split('/')
+            with condition:
+                if path == ['jobs']:
+                    return self.reply(200, [public(j) for j in jobs.values()])
+                if len(path) == 2 and path[0] == 'jobs' and path[1] in jobs:
+                    return self.reply(200, public(jobs[path[1]]))
+            self.reply(404, {'error': f'Unknown path "{self.path}"'})
+        
+        def do_POST(self):
+            if not self.authorized():
+                return
+            if self.headers.get_content_type() != 'application/json':
+                return self.reply(415, {'error': 'The content type must be application/json.'})
+            if self.path.strip('/') != 'jobs':
+                return self.reply(404, {'error': f'Unknown path "{self.path}"'})
+            try:
+                options = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if not isinstance(options, dict):
+                    raise ValueError('The job must be a JSON object.')
+                job = add_job(options)
+            except ValueError as ex:
+                return self.reply(400, {'error': str(ex)})
+            self.reply(202, public(job))
+        
+        def log_message(self, format, *args):
+            pass
+    
+    threading.Thread(target=dispatch, daemon=True).start()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), Handler)
+    
+    # new token at each start, readable only by the user
+    token = secrets.token_hex(32)
+    token_file = daemon_token_file(args)
+    safe_del(token_file)
+    fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    
+    print(f'Daemon listening on 127.0.0.1:{args.port} with {concurrency} concurrent build(s)')
+    print(f'Token in "{token_file}"')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        safe_del(token_file)
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
 def build_generated_data(args):
-    import shutil
     import subprocess
     import zipfile
     from datetime import datetime
@@ -158,15 +447,11 @@ def build_generated_data(args):
     run_animation(data_client, 'Extracting data client')
     
     async def assets_dl():
-        assets_json = {}
-        assets_json['assets'] = version_json['assets']
-        assets_json['asset_index'] = version_json['asset_index']
-        write_json(os.path.join(temp, 'assets.json'), assets_json)
-        downloading_assets_json(temp)
+        assets_dl.index = downloading_assets_json(temp, version_json['assets'], version_json['asset_index'])
     run_animation(assets_dl, 'Downloading assets.json')
     
     async def assets_files_dl():
-        downloading_assets_files(temp)
+        downloading_assets_files(temp, assets_dl.index)
     run_animation(assets_files_dl, 'Downloading assets files')
     
     write_json(os.path.join(temp, version+'.json') , version_json)
@@ -200,74 +485,51 @@ def build_generated_data(args):
             zip_version_path = os.path.join(temp, version+'.zip')
             safe_del(zip_path)
             safe_del(zip_version_path)
-            shutil.make_archive(os.path.splitext(zip_path)[0], 'zip', root_dir=temp)
+            make_zip_archive(zip_path, temp, compresslevel=args.zip_level, workers=args.jobs)
             os.rename(zip_path, zip_version_path)
         run_animation(make_zip, 'Empack into a ZIP')
     
     async def move_generated_data():
-        if os.path.exists(output):
-            if args.overwrite:
-                safe_del(output)
-            else:
-                print(f'The output at "{output}" already exit and the overwrite is not enable')
-                return -1
+        if os.path.exists(output) and not args.overwrite:
+            print(f'The output at "{output}" already exit and the overwrite is not enable')
+            return -1
         
-        os.makedirs(output, exist_ok=True)
-        for dir in os.listdir(temp):
-            shutil.move(os.path.join(temp, dir), os.path.join(output, dir))
+        place_output(temp, output, move=True)
         
     run_animation(move_generated_data, f'Move generated data to "{output}"')
 
-def downloading_assets_json(temp):
-    import json
+def downloading_assets_json(temp, assets=None, asset_index=None) -> AssetIndex:
+    if not asset_index:
+        assets_json = read_json(os.path.join(temp, 'assets.json'))
+        assets = assets_json['assets']
+        asset_index = assets_json['asset_index']
     
-    assets_json = read_json(os.path.join(temp, 'assets.json'))
-    custom_data = [
-        'assets',
-        'asset_index',
-    ]
-    assets_json = {k:assets_json[k] for k in custom_data}
-    with urlopen(assets_json['asset_index']) as f:
-        assets_file = json.load(f)
+    index = AssetIndex.download(assets, asset_index)
     
-    for k,v in assets_file.items():
-        assets_json[k] = v
-    
-    assets_json['objects'] = {k:assets_json['objects'][k] for k in sorted(assets_json['objects'].keys())}
-    for a in assets_json['objects']:
-        hash = assets_json['objects'][a]['hash']
-        assets_json['objects'][a]['url'] = 'https://resources.download.minecraft.net/'+hash[0:2]+'/'+hash
-    
-    write_json(os.path.join(temp, 'assets.json'), assets_json)
-    write_lines(os.path.join(temp, 'assets.txt'), sorted(assets_json['objects'].keys()))
+    write_json(os.path.join(temp, 'assets.json'), index.to_json())
+    write_lines(os.path.join(temp, 'assets.txt'), index.names)
+    return index
 
-def downloading_assets_files(temp):
-    assets = read_json(os.path.join(temp, 'assets.json'))['objects']
-    
-    def write_asset(file):
-        if file in assets:
-            asset = assets[file]
-            file = os.path.join(temp, 'assets', file)
-            if not hash_test(asset['hash'], file):
-                safe_del(file)
-                make_dirname(file)
-                urlretrieve(asset['url'], file)
+def downloading_assets_files(temp, index: AssetIndex=None):
+    if index is None:
+        assets_json = read_json(os.path.join(temp, 'assets.json'))
+        index = AssetIndex(assets_json['assets'], assets_json['asset_index'], assets_json)
     
     assets_dl = [
         'minecraft/sounds.json',
         'sounds.json',
         'pack.mcmeta',
     ]
-    for a in assets_dl:
-        write_asset(a)
+    idxs = [index.find(a) for a in assets_dl]
+    idxs = [i for i in idxs if i is not None]
     
     prefix_dl = [
         'minecraft/textures',
     ]
     for p in prefix_dl:
-        for a in assets:
-            if a.startswith(p):
-                write_asset(a)
+        idxs.extend(index.prefix_range(p))
+    
+    download_assets(index.entries(idxs), os.path.join(temp, 'assets'))
 
 
 class TBLpool():
@@ -446,43 +708,147 @@ def flat_function(entry):
     return flat_n(entry, 'function')
 
 def unquoted_json(obj) -> str:
-    import json
-    import re
-    # remove the quote around the name of the propety {name: "Value"}
-    return re.sub(r'"([^":\\/]+)":', r'\1:', json.dumps(obj, indent=None))
+    # compact JSON without the quote around the name of the propety {name: "Value"}
+    # same output as json.dumps(obj) with the quote of the simple keys removed
+    t = type(obj)
+    if t is str:
+        return encode_basestring_ascii(obj)
+    if t is dict:
+        return '{'+ ', '.join([_unquoted_key(k)+': '+unquoted_json(v) for k,v in obj.items()]) +'}'
+    if t is list or t is tuple:
+        return '['+ ', '.join([unquoted_json(v) for v in obj]) +']'
+    if t is int:
+        return int.__repr__(obj)
+    if t is float:
+        return _json_float(obj)
+    if obj is True:
+        return 'true'
+    if obj is False:
+        return 'false'
+    if obj is None:
+        return 'null'
+    
+    # subclasses
+    for t in (str, dict, list, tuple, int, float):
+        if isinstance(obj, t):
+            return unquoted_json(t(obj))
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def _json_float(value: float) -> str:
+    rslt = float.__repr__(value)
+    match rslt:
+        case 'nan':
+            return 'NaN'
+        case 'inf':
+            return 'Infinity'
+        case '-inf':
+            return '-Infinity'
+    return rslt
+
+def _unquoted_key(key) -> str:
+    if type(key) is str:
+        rslt = _unquoted_key.cache.get(key)
+        if rslt is None:
+            rslt = encode_basestring_ascii(key)
+            name = rslt[1:-1]
+            if name and not any(c in name for c in '":\\/'):
+                rslt = name
+            _unquoted_key.cache[key] = rslt
+        return rslt
+    
+    if key is True or key is False or key is None:
+        return unquoted_json(key)
+    if isinstance(key, (int, float)):
+        return unquoted_json(key)
+    if isinstance(key, str):
+        return _unquoted_key(str(key))
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+_unquoted_key.cache = {}
 
 def str_to_json(text) -> dict|list:
-    import json
-    return json.loads(text)
+    from common import json_backend
+    return json_backend().loads(text)
 
 def enum_json(dir, is_tag=False, ns=None) -> list[str]:
     lst = glob.iglob('**/*.json', root_dir=dir, recursive=True)
     return [('#' if is_tag else '')+namespace(filename(j), ns=ns) for j in lst]
 
 def get_languages_json(temp) -> dict[str, str]:
-    path = os.path.join(temp, 'assets/minecraft/lang/en_us.json')
-    if os.path.exists(path):
-        return read_json(path)
-    
-    path = os.path.join(temp, 'assets/minecraft/lang/en_us.lang')
-    if os.path.exists(path):
-        return parse_languages_lang(path)
-    
-    path = os.path.join(temp, 'assets/lang/en_us.lang')
-    if os.path.exists(path):
-        return parse_languages_lang(path)
+    for path in ['assets/minecraft/lang/en_us.json', 'assets/minecraft/lang/en_us.lang', 'assets/lang/en_us.lang']:
+        path = os.path.join(temp, path)
+        if os.path.exists(path):
+            return read_language(path)
     
     return None
 
+def read_language(path) -> dict[str, str]:
+    """
+    Translations of a language file, JSON or legacy .lang
+    
+    Each file is loaded once, the next calls return the same dict while the file is not modified.
+    The returned dict is shared and must not be modified.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = read_language.cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    
+    if path.endswith('.json'):
+        rslt = read_json(path)
+    else:
+        rslt = parse_languages_lang(path)
+    read_language.cache[path] = key, rslt
+    return rslt
+read_language.cache = {}
+
 def parse_languages_lang(path) -> dict[str, str]:
     rslt = {}
-    for l in read_lines(path):
+    for l in read_text(path).splitlines(False):
         if '=' not in l:
             continue
         split = l.split('=',1)
         rslt[split[0]] = split[1]
     return rslt
 
+LANG_MMAP_SIZE = 2**16
+
+def read_language_keys(path, keys) -> dict[str, str]:
+    """
+    Extract some keys of a legacy .lang file without parsing it whole, the large files are memory-mapped
+    
+    As parse_languages_lang(), the last line of a key is the one kept. The missing keys are not in the result.
+    """
+    import mmap
+    
+    def find(buf, key):
+        needle = key.encode('utf-8') + b'='
+        end = len(buf)
+        while (idx := buf.rfind(needle, 0, end)) >= 0:
+            if idx == 0 or buf[idx-1] in b'\r\n':
+                start = idx + len(needle)
+                stop = min((i for i in (buf.find(b'\n', start), buf.find(b'\r', start)) if i >= 0), default=len(buf))
+                return buf[start:stop].decode('utf-8')
+            end = idx + len(needle) - 1
+        return None
+    
+    rslt = {}
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= LANG_MMAP_SIZE:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = f.read()
+        try:
+            for key in keys:
+                value = find(buf, key)
+                if value is not None:
+                    rslt[key] = value
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+    return rslt
+
 def parse_json_text(json_text, languages_json) -> str|None:
     if json_text is None or isinstance(json_text, str):
         return json_text
@@ -566,21 +932,24 @@ def get_sub_folders_data(temp) -> tuple[list[str], list[str]]:
     return _get_sub_folders(temp, 'data', lst_exlude)
 
 def uniform_reports(temp):
-    do_uniform = False
-    
+    # the old reports/items.json have the components as a list, sorted by type to be stable between versions
     items_json = os.path.join(temp, 'reports/items.json')
-    if os.path.exists(items_json) and '"components": [' in read_text(items_json):
-        j = read_json(items_json)
-        for k in j.keys():
-            if 'components' in j[k] and isinstance(j[k]['components'], list):
-                j[k]['components'] = list(sorted(j[k]['components'], key=lambda x: x['type']))
-        write_json(items_json, j)
-        do_uniform = True
+    if not os.path.exists(items_json):
+        return
+    with open(items_json, 'rt', encoding='utf-8') as f:
+        head = f.read(2**14)
+    if '"components": [' not in head:
+        return
+    
+    def sorted_components():
+        for k,v in iter_json_items(items_json):
+            if 'components' in v and isinstance(v['components'], list):
+                v['components'] = list(sorted(v['components'], key=lambda x: x['type']))
+            yield k,v
+    write_json_items(items_json, sorted_components())
     
-    if do_uniform:
-        for j in glob.iglob('reports/*.json', root_dir=temp, recursive=False):
-            j = os.path.join(temp, j)
-            write_text(j, read_text(j))
+    for j in glob.iglob('reports/*.json', root_dir=temp, recursive=False):
+        normalize_newlines(os.path.join(temp, j))
 
 
 def listing_builtit_datapacks(temp):
@@ -597,6 +966,11 @@ def listing_structures(temp):
         write_lines(os.path.join(temp, 'lists', os.path.basename(dir)+'.nbt.txt'), sorted(lines))
 
 class Advancement():
+    __slots__ = (
+        'full_name', 'namespace', 'path', 'json', 'parent', 'rewards', 'icon', 'title', 'frame',
+        'description', 'background', 'show_toast', 'announce_to_chat', 'hidden',
+    )
+    
     def __init__(self, file: str, json: dict):
         self.full_name = namespace(filename(file))
         self.namespace = self.full_name.split(':')[0]
@@ -660,17 +1034,40 @@ def listing_advancements(temp):
         'assets/minecraft/advancements', # legacy
     ])
     
+    # single scan, the advancements of the tree are read while listing them
+    tree_dirs = {os.path.normpath(os.path.join(temp, dp, dir)) for dp in get_datapack_paths(temp)}
+    advancements: dict[str, Advancement] = {}
+    tree_child = defaultdict(set)
+    
+    def scan(root_dir, ns=None, listing=True) -> list[str]:
+        root_dir = os.path.normpath(root_dir)
+        is_tree = root_dir in tree_dirs
+        tree_dirs.discard(root_dir)
+        rslt = []
+        for j in glob.iglob('**/*.json', root_dir=root_dir, recursive=True):
+            if listing:
+                rslt.append(namespace(filename(j), ns=ns))
+            if is_tree:
+                advc = Advancement(j, read_json(os.path.join(root_dir, j)))
+                if advc.path.startswith('recipes/'):
+                    continue
+                advancements[advc.full_name] = advc
+                tree_child[advc.parent].add(advc.full_name)
+        return rslt
+    
     lst_namespace, _dirs = get_sub_folders_data(temp)
     entries = set()
     tags = set()
-    entries.update(enum_json(os.path.join(temp, 'assets/minecraft/advancements')))
+    entries.update(scan(os.path.join(temp, 'assets/minecraft/advancements')))
     for ns in lst_namespace:
         for dp in get_datapack_paths(temp):
-            entries.update(enum_json(os.path.join(temp, dp, 'data', ns, 'advancement'), ns=ns))
+            entries.update(scan(os.path.join(temp, dp, 'data', ns, 'advancement'), ns=ns))
             tags.update(enum_json(os.path.join(temp, dp, 'data', ns, 'tags/advancement'), ns=ns, is_tag=True))
             # legacy
-            entries.update(enum_json(os.path.join(temp, dp, 'data', ns, 'advancements'), ns=ns))
+            entries.update(scan(os.path.join(temp, dp, 'data', ns, 'advancements'), ns=ns))
             tags.update(enum_json(os.path.join(temp, dp, 'data', ns, 'tags/advancements'), ns=ns, is_tag=True))
+    for root_dir in sorted(tree_dirs):
+        scan(root_dir, listing=False)
     
     recipes = set(e for e in entries if ':recipes/' in e)
     entries.difference_update(recipes)
@@ -682,19 +1079,7 @@ def listing_advancements(temp):
     if recipes:
         write_lines(os.path.join(temp, 'lists', os.path.basename(dir)+'.recipes.txt'), sorted(recipes) + sorted(tags_recipes))
     
-    entries: dict[str, Advancement] = {}
-    tree_child = defaultdict(set)
-    for dp in get_datapack_paths(temp):
-        root_dir = os.path.join(temp, dp, dir)
-        for j in glob.iglob('**/*.json', root_dir=root_dir, recursive=True):
-            advc = Advancement(j, read_json(os.path.join(root_dir, j)))
-            if advc.path.startswith('recipes/'):
-                continue
-            entries[advc.full_name] = advc
-            tree_child[advc.parent].add(advc.full_name)
-    
     # advancement.tree
-    lines = []
     tree = {}
     
     indent_line  = '│ '
@@ -706,9 +1091,8 @@ def listing_advancements(temp):
     for k in tree_child.keys():
         tree_child[k] = list(sorted(tree_child[k]))
     
-    def read_tree(full_name: str, parent_tree: dict):
-        advc = entries[full_name]
-        parent_tree[full_name] = entry = {}
+    def tree_entry(advc: Advancement) -> dict:
+        entry = {}
         entry['icon'] = advc.icon
         entry['title'] = parse_json_text(advc.title, languages_json)
         if advc.description:
@@ -720,36 +1104,35 @@ def listing_advancements(temp):
             entry['rewards'] = advc.rewards
         if advc.hidden:
             entry['hidden'] = advc.hidden
-        
-        child_count = len(tree_child[full_name])
-        if child_count:
-            entry['childs'] = child_tree = {}
-        for child in tree_child[full_name]:
-            read_tree(child, child_tree)
-    
-    def tree_text(pre: str, full_name: str, last_child: bool):
-        lines.append(pre+(indent_child if last_child is not None else '')+filename(full_name))
-        
-        if last_child is None:
-            pre = ''
-        if last_child is True:
-            pre += indent_line
-        if last_child is False:
-            pre += indent_space
-        
-        child_count = len(tree_child[full_name])
-        for idx,child in enumerate(tree_child[full_name], 1):
-            tree_text(pre, child, (idx != child_count))
-    
-    for r in tree_child[None]:
-        read_tree(r, tree)
-        tree_text('', r, None)
-        lines.append('')
-    
-    strip_list(lines)
-    
-    if lines:
-        write_lines(os.path.join(temp, 'lists', os.path.basename(dir)+'.tree.txt'), lines)
+        return entry
+    
+    def tree_lines():
+        # iterative DFS, build the .tree.json and yield the lines of the .tree.txt
+        for idx_root,root in enumerate(tree_child[None]):
+            if idx_root:
+                yield ''
+            stack = [(root, tree, '', None)]
+            while stack:
+                full_name, parent_tree, pre, last_child = stack.pop()
+                yield pre+(indent_child if last_child is not None else '')+filename(full_name)
+                
+                parent_tree[full_name] = entry = tree_entry(advancements[full_name])
+                
+                if last_child is None:
+                    pre = ''
+                if last_child is True:
+                    pre += indent_line
+                if last_child is False:
+                    pre += indent_space
+                
+                childs = tree_child[full_name]
+                if childs:
+                    entry['childs'] = child_tree = {}
+                    child_count = len(childs)
+                    stack.extend(reversed([(child, child_tree, pre, (idx != child_count)) for idx,child in enumerate(childs, 1)]))
+    
+    if tree_child[None]:
+        write_lines(os.path.join(temp, 'lists', os.path.basename(dir)+'.tree.txt'), tree_lines())
     if tree:
         write_json(os.path.join(temp, 'lists', os.path.basename(dir)+'.tree.json'), tree)
 
@@ -820,6 +1203,18 @@ def listing_loot_tables(temp):
     if blocks:
         write_lines(os.path.join(temp, 'lists', os.path.basename(dir)+'.blocks.txt'), sorted(blocks) + sorted(tags_blocks))
     
+    jobs = []
+    for dp in get_datapack_paths(temp):
+        for loot in glob.iglob('**/*.json', root_dir=os.path.join(temp, dp, dir), recursive=True):
+            if loot == 'empty.json' or filename(loot).startswith('blocks'):
+                continue
+            jobs.append((temp, os.path.join(temp, dp, dir, loot), filename(loot)))
+    
+    run_jobs(render_loot_table, jobs)
+
+def render_loot_table(temp, path, name):
+    # work unit of listing_loot_tables(), write the .txt/.csv/.md of one table
+    # only depend of its arguments, to be run in a worker process
     def get_simple(name, entry):
         def convert(item):
             item = namespace(item)
@@ -1186,86 +1581,78 @@ def listing_loot_tables(temp):
         else:
             raise ValueError('listing_loot_tables(): Invalid input pool.')
     
-    for dp in get_datapack_paths(temp):
-        for loot in glob.iglob('**/*.json', root_dir=os.path.join(temp, dp, dir), recursive=True):
-            if loot == 'empty.json':
-                continue
-            table = read_json(os.path.join(temp, dp, dir, loot))
-            name = filename(loot)
-            
-            rslt_tbl :list[TBLpool] = []
+    table = read_json(path)
+    
+    rslt_tbl :list[TBLpool] = []
+    
+    for pool in table.get('pools', {}):
+        tbl_pool = TBLpool()
+        tbl_pool.rolls = get_rolls(pool)
+        tbl_pool.comment = get_poolcomment(pool)
+        
+        rslt_tbl.append(tbl_pool)
+        
+        weight_groupe = len(tbl_pool.all_weight_groupes())
+        iter_pool(tbl_pool, pool, weight_groupe)
+    
+    lines_txt = []
+    lines_tbl = []
+    
+    head_tbl = ['Name', 'Count', 'Chance', 'Weight', 'Comment']
+    for l in rslt_tbl:
+        lines_tbl.append([l.rolls,'--','--','--',l.comment])
+        
+        use_weight_groupe = len(l.all_weight_groupes()) > 1
+        
+        for e in l.entries:
+            c = e.chance
             
-            if name.startswith('blocks'):
-                continue
+            if c is None:
+                c = ''
+            elif c < 1:
+                c = str(round(c, 2))+'%'
             else:
-                for pool in table.get('pools', {}):
-                    tbl_pool = TBLpool()
-                    tbl_pool.rolls = get_rolls(pool)
-                    tbl_pool.comment = get_poolcomment(pool)
-                    
-                    rslt_tbl.append(tbl_pool)
-                    
-                    weight_groupe = len(tbl_pool.all_weight_groupes())
-                    iter_pool(tbl_pool, pool, weight_groupe)
-            
-            lines_txt = []
-            lines_tbl = []
+                c = no_end_0(round(c, 1))+'%'
             
-            head_tbl = ['Name', 'Count', 'Chance', 'Weight', 'Comment']
-            for l in rslt_tbl:
-                lines_tbl.append([l.rolls,'--','--','--',l.comment])
-                
-                use_weight_groupe = len(l.all_weight_groupes()) > 1
-                
-                for e in l.entries:
-                    c = e.chance
-                    
-                    if c is None:
-                        c = ''
-                    elif c < 1:
-                        c = str(round(c, 2))+'%'
-                    else:
-                        c = no_end_0(round(c, 1))+'%'
-                    
-                    if use_weight_groupe or e.alternatives_groupe:
-                        groupe = ' '.join([
-                            ('{'+str(e.alternatives_groupe)+'}') if e.alternatives_groupe else '',
-                            ('['+str(e.weight_groupe+1)+']') if use_weight_groupe else '',
-                        ]).strip()
-                        prefix, suffix = groupe+' ',' '+groupe
-                    else:
-                        prefix, suffix = '',''
-                    lines_txt.append(prefix+e.name)
-                    lines_tbl.append([
-                        prefix+e.name,
-                        e.count + (suffix if e.count else ''),
-                        c + (suffix if c else ''),
-                        e.propabilty + (suffix if e.propabilty else ''),
-                        e.comment,
-                    ])
-                
-                lines_txt.append('')
-                lines_tbl.append(None)
-            
-            strip_list(lines_txt)
-            if not lines_txt:
-                lines_txt.append('empty')
-            write_lines(os.path.join(temp, 'lists/loot_tables', name+'.txt'), lines_txt)
-            
-            
-            strip_list(lines_tbl)
-            if not lines_tbl:
-                lines_tbl.append(['empty','','100%','1',''])
-            
-            for i in range(len(lines_tbl)):
-                if lines_tbl[i]:
-                    for y in range(len(lines_tbl[i])):
-                        d = str(lines_tbl[i][y])
-                        if d:
-                            lines_tbl[i][y] = no_end_0(d)
-            
-            write_tbl_csv(os.path.join(temp, 'lists/loot_tables', name+'.csv'), head_tbl, lines_tbl)
-            write_tbl_md(os.path.join(temp, 'lists/loot_tables', name+'.md'), head_tbl, lines_tbl)
+            if use_weight_groupe or e.alternatives_groupe:
+                groupe = ' '.join([
+                    ('{'+str(e.alternatives_groupe)+'}') if e.alternatives_groupe else '',
+                    ('['+str(e.weight_groupe+1)+']') if use_weight_groupe else '',
+                ]).strip()
+                prefix, suffix = groupe+' ',' '+groupe
+            else:
+                prefix, suffix = '',''
+            lines_txt.append(prefix+e.name)
+            lines_tbl.append([
+                prefix+e.name,
+                e.count + (suffix if e.count else ''),
+                c + (suffix if c else ''),
+                e.propabilty + (suffix if e.propabilty else ''),
+                e.comment,
+            ])
+        
+        lines_txt.append('')
+        lines_tbl.append(None)
+    
+    strip_list(lines_txt)
+    if not lines_txt:
+        lines_txt.append('empty')
+    write_lines(os.path.join(temp, 'lists/loot_tables', name+'.txt'), lines_txt)
+    
+    
+    strip_list(lines_tbl)
+    if not lines_tbl:
+        lines_tbl.append(['empty','','100%','1',''])
+    
+    for i in range(len(lines_tbl)):
+        if lines_tbl[i]:
+            for y in range(len(lines_tbl[i])):
+                d = str(lines_tbl[i][y])
+                if d:
+                    lines_tbl[i][y] = no_end_0(d)
+    
+    write_tbl_csv(os.path.join(temp, 'lists/loot_tables', name+'.csv'), head_tbl, lines_tbl)
+    write_tbl_md(os.path.join(temp, 'lists/loot_tables', name+'.md'), head_tbl, lines_tbl)
 
 def listing_worldgens(temp):
     dir = match_dir(temp, [
@@ -1336,21 +1723,71 @@ def listing_worldgens(temp):
                 
                 write_lines(os.path.join(temp, 'lists/worldgen/biome/features', path+'.txt'), lines)
     
+    datapack_paths = get_datapack_paths(temp)
     for subdir in glob.iglob('*/', root_dir=os.path.join(temp, dir), recursive=False):
         subdir = subdir.strip('/\\')
         entries = set()
         tags = set()
-        for dp in get_datapack_paths(temp):
+        for dp in datapack_paths:
             entries.update(enum_json(os.path.join(temp, dp, dir,                            subdir)))
             tags.update(   enum_json(os.path.join(temp, dp, 'data/minecraft/tags/worldgen', subdir), is_tag=True))
-            biomes_list(os.path.join(temp, dp, dir, 'biome'))
         write_lines(os.path.join(temp, 'lists/worldgen', subdir +'.txt'), sorted(entries) + sorted(tags))
     
+    # the biomes are parsed once for all the worldgen registries
+    for dp in datapack_paths:
+        biomes_list(os.path.join(temp, dp, dir, 'biome'))
+    
     dir = os.path.join(temp, 'reports/biomes') #legacy
     if os.path.exists(dir):
         write_lines(os.path.join(temp, 'lists/worldgen', 'biome.txt'), sorted(enum_json(dir)))
         biomes_list(dir)
 
+class BlockTable():
+    """
+    Columnar table of the blocks, with one row by property value and one row by definition key
+    """
+    def __init__(self):
+        from array import array
+        
+        self.blocks: list[str] = []
+        
+        self.prop_block = array('I')
+        self.prop_name: list[str] = []
+        self.prop_value: list[str] = []
+        
+        self.def_block = array('I')
+        self.def_key: list[str] = []
+        self.def_value: list[str] = []
+    
+    def add_block(self, name: str) -> int:
+        self.blocks.append(name)
+        return len(self.blocks)-1
+    
+    def add_property(self, block_id: int, name: str, value: str):
+        from sys import intern
+        self.prop_block.append(block_id)
+        self.prop_name.append(intern(name))
+        self.prop_value.append(intern(value))
+    
+    def add_definition(self, block_id: int, key: str, value: str):
+        from sys import intern
+        self.def_block.append(block_id)
+        self.def_key.append(intern(key))
+        self.def_value.append(value)
+    
+    def group_by(self, column: list, rows=None):
+        """
+        yield (value, rows) for each distinct value of the column, sorted by value
+        """
+        from itertools import groupby
+        
+        rows = sorted(range(len(column)) if rows is None else rows, key=column.__getitem__)
+        for value, group in groupby(rows, key=column.__getitem__):
+            yield value, list(group)
+    
+    def block_names(self, column, rows) -> list[str]:
+        return sorted(set(self.blocks[column[i]] for i in rows))
+
 def listing_blocks(temp):
     def mcrange(name, entry):
         type_name = flat_type(entry)
@@ -1393,14 +1830,13 @@ def listing_blocks(temp):
             case _:
                 raise value_error
     
-    blockstates = defaultdict(lambda:defaultdict(set))
-    definitions = defaultdict(dict)
+    table = BlockTable()
     
-    rj = read_json(os.path.join(temp, 'reports/blocks.json'))
-    if rj:
-        write_lines(os.path.join(temp, 'lists', 'block.txt'), sorted(rj.keys()))
-    for name,content in rj.items():
+    block_names = []
+    for name,content in iter_json_items(os.path.join(temp, 'reports/blocks.json')):
+        block_names.append(name)
         name = flatering(name)
+        block_id = table.add_block(namespace(name))
         lines = []
         for bs in content.pop('states', []):
             properties = bs.get('properties', {})
@@ -1416,22 +1852,23 @@ def listing_blocks(temp):
                 case 'properties':
                     for k,v in content_value.items():
                         for vv in v:
-                            blockstates[k][vv].add(namespace(name))
+                            table.add_property(block_id, k, vv)
                 case 'definition':
                     write_json(os.path.join(temp, 'lists/blocks/definition', name+'.json'), content_value, sort_keys=True)
                     for k,v in content_value.items():
                         value = parse_value(name, k, v)
                         if value is not None:
-                            definitions[k][namespace(name)] = value
+                            table.add_definition(block_id, k, value)
                 case _:
                     raise ValueError(f'listing_blocks(): Block element {content_type!r} not implemented.')
     
-    for k,v in blockstates.items():
-        lines = set()
-        for kk,vv in v.items():
-            lines.update(vv)
-            write_lines(os.path.join(temp, 'lists/blocks/properties', k+'='+kk+'.txt'), sorted(vv))
-        write_lines(os.path.join(temp, 'lists/blocks/properties', k+'.txt'), sorted(lines))
+    if block_names:
+        write_lines(os.path.join(temp, 'lists', 'block.txt'), sorted(block_names))
+    
+    for k,rows in table.group_by(table.prop_name):
+        for kk,value_rows in table.group_by(table.prop_value, rows):
+            write_lines(os.path.join(temp, 'lists/blocks/properties', k+'='+kk+'.txt'), table.block_names(table.prop_block, value_rows))
+        write_lines(os.path.join(temp, 'lists/blocks/properties', k+'.txt'), table.block_names(table.prop_block, rows))
     
     grouped = [
         'aabb_offset',
@@ -1451,30 +1888,52 @@ def listing_blocks(temp):
     all_blocks = [
         'type',
     ]
-    for k,v in definitions.items():
+    for k,rows in table.group_by(table.def_key):
         if k in grouped or k in all_blocks:
             if k in grouped:
-                write_lines(os.path.join(temp, 'lists/blocks/definition/groups', k+'.txt'), sorted(v.keys()))
-            dic = defaultdict(set)
-            for kk,vv in v.items():
-                dic[vv].add(kk)
-            for kk,vv in dic.items():
+                write_lines(os.path.join(temp, 'lists/blocks/definition/groups', k+'.txt'), table.block_names(table.def_block, rows))
+            for kk,value_rows in table.group_by(table.def_value, rows):
                 if k in all_blocks:
-                    write_lines(os.path.join(temp, 'lists/blocks/definition', k, flatering(kk)+'.txt'), sorted(vv))
+                    write_lines(os.path.join(temp, 'lists/blocks/definition', k, flatering(kk)+'.txt'), table.block_names(table.def_block, value_rows))
                 else:
-                    write_lines(os.path.join(temp, 'lists/blocks/definition/groups', k+'='+kk+'.txt'), sorted(vv))
+                    write_lines(os.path.join(temp, 'lists/blocks/definition/groups', k+'='+kk+'.txt'), table.block_names(table.def_block, value_rows))
         else:
-            lines = [f'{kk}  = {vv}' for kk,vv in v.items()]
+            lines = [f'{table.blocks[table.def_block[i]]}  = {table.def_value[i]}' for i in rows]
             write_lines(os.path.join(temp, 'lists/blocks/definition/values', k+'.txt'), sorted(lines))
 
+ITEM_DEFAULT_COMPONENTS = [
+    'lore',
+    'enchantments',
+    'repair_cost',
+    'attribute_modifiers',
+    'tooltip_display',
+]
+ITEM_COMPONENTS_GROUPED_VALUE = [
+    'max_stack_size',
+    'rarity',
+    'break_sound',
+]
+ITEM_COMPONENTS_ALWAYS_JSON_VALUE = [
+    'tool',
+    'food',
+    'consumable',
+    'equippable',
+    'death_protection',
+    'weapon',
+]
+ITEM_JSON_TEXT_COMPONENTS = [
+    'item_name',
+]
+
 def listing_items(temp):
     languages_json = get_languages_json(temp)
-    itemstates = defaultdict(lambda:defaultdict(dict))
-    rj = read_json(os.path.join(temp, 'reports/items.json'))
-    if rj:
-        write_lines(os.path.join(temp, 'lists', 'item.txt'), sorted(rj.keys()))
-    for k,v in rj.items():
+    # columnar index, component: ([items], [values])
+    components = defaultdict(lambda:([], []))
+    item_names = []
+    for k,v in iter_json_items(os.path.join(temp, 'reports/items.json')):
+        item_names.append(k)
         name = flatering(k)
+        item = namespace(k)
         
         v.pop('protocol_id', None)
         if v:
@@ -1486,136 +1945,122 @@ def listing_items(temp):
         for vk in v:
             if vk == 'components':
                 if isinstance(v[vk], list):
-                    for vs in v[vk]:
-                        type = flatering(vs['type'])
-                        itemstates[vk][type][namespace(k)] = vs['value']
+                    values = ((vs['type'], vs['value']) for vs in v[vk])
                 else:
-                    for type,value in v[vk].items():
-                        type = flatering(type)
-                        itemstates[vk][type][namespace(k)] = value
+                    values = v[vk].items()
+                for type,value in values:
+                    column = components[flatering(type)]
+                    column[0].append(item)
+                    column[1].append(value)
             else:
                 raise ValueError(f'listing_items(): ItemStates {vk!r} not implemented.')
     
-    def _one_key_dict(value):
-        if len(value) == 1:
-            return list(value.keys())[0]
-        return None
+    if item_names:
+        write_lines(os.path.join(temp, 'lists', 'item.txt'), sorted(item_names))
     
-    def component_test_value(value, is_file: bool):
-        if value:
-            if isinstance(value, dict):
-                sub_key = _one_key_dict(value)
-                if sub_key:
-                    if isinstance(value[sub_key], (dict, list)):
-                        return bool(value[sub_key])
-                    else:
-                        return False
-                
-                return bool(value)
-            
-            if isinstance(value, list):
-                if is_file and len(value) == 1 and isinstance(value[0], (int, float, bool, str)):
-                    return False
-                return bool(value)
-            if isinstance(value, str):
-                return bool(value)
-        return False
-    
-    def component_text_value(value, allow_inline: bool):
-        rslt = None
-        if isinstance(value, (int, float, bool)):
-            rslt = str(value)
-        if isinstance(value, str):
-            if value:
-                rslt = value
-            else:
-                rslt = '""'
-        if isinstance(value, list):
-            if value:
-                rslt = '[[value]]'
-            else:
-                rslt = '[]'
-            if allow_inline and len(value) == 1 and isinstance(value[0], (int, float, bool, str)):
-                rslt = unquoted_json(value)
+    for c in ITEM_JSON_TEXT_COMPONENTS:
+        if c in components:
+            values = components[c][1]
+            for i,v in enumerate(values):
+                if isinstance(v, str):
+                    v = str_to_json(v)
+                values[i] = _quote_str(parse_json_text(v, languages_json))
+    
+    # each component is a independent work unit
+    run_jobs(render_item_component, [(temp, c, items, values) for c,(items, values) in components.items()])
+
+_INLINE_TYPES = (int, float, bool, str)
+_CONTAINER_TYPES = (dict, list)
+
+def _one_key_dict(value):
+    if len(value) == 1:
+        return next(iter(value))
+    return None
+
+def component_test_value(value, is_file: bool) -> bool:
+    if value:
         if isinstance(value, dict):
-            if value:
-                rslt = '{{value}}'
-            else:
-                rslt = '{}'
             sub_key = _one_key_dict(value)
-            if allow_inline and sub_key:
-                if isinstance(value[sub_key], (dict, list)):
-                    if not value[sub_key]:
-                        rslt = unquoted_json(value)
+            if sub_key:
+                sub_value = value[sub_key]
+                if isinstance(sub_value, _CONTAINER_TYPES):
+                    return bool(sub_value)
                 else:
-                    rslt = unquoted_json(value)
+                    return False
+            
+            return True
         
-        if not rslt:
-            raise ValueError(f'listing_items(): component with a unknow type to retrive value {type(value)!r}.')
-        return '  = ' + rslt
-    
-    def _quote_str(value):
-        return '"'+value.replace('"', '\\"')+'"'
-    
-    default_components = [
-        'lore',
-        'enchantments',
-        'repair_cost',
-        'attribute_modifiers',
-        'tooltip_display',
-    ]
-    components_grouped_value = [
-        'max_stack_size',
-        'rarity',
-        'break_sound',
-    ]
-    components_always_json_value = [
-        'tool',
-        'food',
-        'consumable',
-        'equippable',
-        'death_protection',
-        'weapon',
-    ]
-    json_text_components = [
-        'item_name',
-    ]
+        if isinstance(value, list):
+            if is_file and len(value) == 1 and isinstance(value[0], _INLINE_TYPES):
+                return False
+            return True
+        if isinstance(value, str):
+            return True
+    return False
+
+def component_text_value(value, allow_inline: bool) -> str:
+    rslt = None
+    if isinstance(value, (int, float, bool)):
+        rslt = str(value)
+    elif isinstance(value, str):
+        if value:
+            rslt = value
+        else:
+            rslt = '""'
+    elif isinstance(value, list):
+        if value:
+            rslt = '[[value]]'
+        else:
+            rslt = '[]'
+        if allow_inline and len(value) == 1 and isinstance(value[0], _INLINE_TYPES):
+            rslt = unquoted_json(value)
+    elif isinstance(value, dict):
+        if value:
+            rslt = '{{value}}'
+        else:
+            rslt = '{}'
+        sub_key = _one_key_dict(value)
+        if allow_inline and sub_key:
+            sub_value = value[sub_key]
+            if isinstance(sub_value, _CONTAINER_TYPES):
+                if not sub_value:
+                    rslt = unquoted_json(value)
+            else:
+                rslt = unquoted_json(value)
     
-    for k,kv in itemstates.items():
-        match k:
-            case 'components':
-                for c,e in kv.items():
-                    if c in json_text_components:
-                        for n,v in e.items():
-                            if isinstance(v, str):
-                                v = str_to_json(v)
-                            e[n] = _quote_str(parse_json_text(v, languages_json))
-                    
-                    if c in default_components:
-                        lines = [n + component_text_value(v, allow_inline=True) for n,v in e.items() if component_test_value(v, is_file=False)]
-                    elif c in components_always_json_value:
-                        lines = [n + component_text_value(v, allow_inline=False) for n,v in e.items()]
-                    else:
-                        lines = [n + component_text_value(v, allow_inline=True) for n,v in e.items()]
-                    if lines:
-                        write_lines(os.path.join(temp, 'lists/items/components', c+'.txt'), sorted(lines))
-                    
-                    if c in components_grouped_value:
-                        dic = defaultdict(list)
-                        for n,v in e.items():
-                            if isinstance(v, str) and ':' in v:
-                                v = flatering(v)
-                            dic[v].append(n)
-                        for v,n in dic.items():
-                            write_lines(os.path.join(temp, 'lists/items/components', c, str(v)+'.txt'), sorted(set(n)))
-                    else:
-                        for n,v in e.items():
-                            if not isinstance(v, (dict, list)):
-                                continue
-                            if component_test_value(v, is_file=True) or (c in components_always_json_value and v):
-                                write_json(os.path.join(temp, 'lists/items/components', c, flatering(n)+'.json'), v)
-            case _:
-                raise ValueError(f'listing_items(): Unknow item states {k!r}.')
+    if not rslt:
+        raise ValueError(f'listing_items(): component with a unknow type to retrive value {type(value)!r}.')
+    return '  = ' + rslt
+
+def _quote_str(value):
+    return '"'+value.replace('"', '\\"')+'"'
+
+def render_item_component(temp, c, items, values):
+    e = zip(items, values)
+    if c in ITEM_DEFAULT_COMPONENTS:
+        lines = [n + component_text_value(v, allow_inline=True) for n,v in e if component_test_value(v, is_file=False)]
+    elif c in ITEM_COMPONENTS_ALWAYS_JSON_VALUE:
+        lines = [n + component_text_value(v, allow_inline=False) for n,v in e]
+    else:
+        lines = [n + component_text_value(v, allow_inline=True) for n,v in e]
+    if lines:
+        write_lines(os.path.join(temp, 'lists/items/components', c+'.txt'), sorted(lines))
+    
+    if c in ITEM_COMPONENTS_GROUPED_VALUE:
+        dic = defaultdict(list)
+        for n,v in zip(items, values):
+            if isinstance(v, str) and ':' in v:
+                v = flatering(v)
+            dic[v].append(n)
+        for v,n in dic.items():
+            write_lines(os.path.join(temp, 'lists/items/components', c, str(v)+'.txt'), sorted(set(n)))
+    else:
+        always_json = c in ITEM_COMPONENTS_ALWAYS_JSON_VALUE
+        for n,v in zip(items, values):
+            if not isinstance(v, _CONTAINER_TYPES):
+                continue
+            if component_test_value(v, is_file=True) or (always_json and v):
+                write_json(os.path.join(temp, 'lists/items/components', c, flatering(n)+'.json'), v)
 
 def listing_packets(temp):
     for k,tv in read_json(os.path.join(temp, 'reports/packets.json')).items():
@@ -1677,29 +2122,29 @@ def listing_commands(temp):
                 raise ValueError(f'listing_commands(): Unknow type {type_name!r} in commands {name!r}.')
     
     def get_syntaxes(base, entry):
-        rslt = []
-        
-        if entry.get('executable', False):
-            rslt.append(base)
-        
-        if 'redirect' in entry:
-            rslt.append(base +' >>redirect{'+ '|'.join(entry['redirect']) +'}')
-        
-        elif entry.get('type') == 'literal' and len(entry) == 1:
-            rslt.append(base +' >>redirect{*}')
-        
-        elif 'children' in entry:
-            for k,v in entry['children'].items():
-                build = base +' '+ get_argument(k, v)
-                rslt.extend(get_syntaxes(build, v))
-        
-        for k in entry.keys():
-            if k not in ['type', 'executable', 'children', 'parser', 'properties', 'redirect']:
-                raise ValueError(f'listing_commands(): Additional key {k!r} in commands {name!r}.')
-        
-        return rslt
+        # iterative pre-order walk, the lines are yielded as soon as they are build
+        stack = [(base, entry)]
+        while stack:
+            base, entry = stack.pop()
+            
+            for k in entry.keys():
+                if k not in ['type', 'executable', 'children', 'parser', 'properties', 'redirect']:
+                    raise ValueError(f'listing_commands(): Additional key {k!r} in commands {name!r}.')
+            
+            if entry.get('executable', False):
+                yield base
+            
+            if 'redirect' in entry:
+                yield base +' >>redirect{'+ '|'.join(entry['redirect']) +'}'
+            
+            elif entry.get('type') == 'literal' and len(entry) == 1:
+                yield base +' >>redirect{*}'
+            
+            elif 'children' in entry:
+                children = [(base +' '+ get_argument(k, v), v) for k,v in entry['children'].items()]
+                stack.extend(reversed(children))
     
-    for k,v in read_json(os.path.join(temp, 'reports/commands.json')).get('children', {}).items():
+    for k,v in iter_json_items(os.path.join(temp, 'reports/commands.json'), 'children'):
         name = flatering(k)
         write_json(os.path.join(temp, 'lists/commands', name+'.json'), v)
         write_lines(os.path.join(temp, 'lists/commands', name+'.txt'), get_syntaxes(name, v))
@@ -1810,20 +2255,59 @@ def listing_instruments(temp):
                 write_lines(os.path.join(temp, 'lists/instruments', name)+'.txt', lines)
 
 def listing_tags(temp):
-    entries = set()
+    # tag graph, the values of all the datapacks merged as ordered set
+    tags: dict[str, dict[str, None]] = {}
     for dp in get_datapack_paths(temp):
         dir = os.path.join(temp, dp, 'data/minecraft/tags')
-        entries.update(flatering(j) for j in glob.iglob('**/*.json', root_dir=dir, recursive=True))
-    
-    for name in entries:
-        lines = []
-        for dp in get_datapack_paths(temp):
-            j = os.path.join(temp, dp, 'data/minecraft/tags', name)
-            for v in read_json(j).get('values', []):
-                if v not in lines:
-                    lines.append(v)
+        for j in glob.iglob('**/*.json', root_dir=dir, recursive=True):
+            values = tags.setdefault(filename(j), {})
+            values.update(dict.fromkeys(read_json(os.path.join(dir, j)).get('values', [])))
+    
+    for name,values in tags.items():
+        write_lines(os.path.join(temp, 'lists/tags', name+'.txt'), list(values))
+    
+    if not listing_tags.resolve:
+        return
+    
+    def registry(name):
+        split = name.split('/')
+        return '/'.join(split[:2 if split[0] == 'worldgen' else 1])
+    
+    # a tag of a cycle is resolved again from each of its members, the references to the tags
+    # being resolved are skipped, so the results don't depend on the order and a tag never contains itself
+    resolved: dict[str, list[str]] = {}
+    def resolve(name, stack: dict[str, int]) -> tuple[list[str], int]:
+        # return the values and the lowest position in the stack reached by a cycle
+        if name in resolved:
+            return resolved[name], len(stack)
+        index = stack[name] = len(stack)
+        low = index+1
+        
+        rslt = {}
+        for v in tags[name]:
+            if isinstance(v, str) and v.startswith('#'):
+                ns, _, path = v[1:].rpartition(':')
+                sub_name = registry(name)+'/'+path
+                if (ns or 'minecraft') == 'minecraft' and sub_name in tags:
+                    if sub_name in stack:
+                        low = min(low, stack[sub_name])
+                    else:
+                        sub_values, sub_low = resolve(sub_name, stack)
+                        low = min(low, sub_low)
+                        rslt.update(dict.fromkeys(sub_values))
+                    continue
+            rslt[v] = None
         
-        write_lines(os.path.join(temp, 'lists/tags', filename(name)+'.txt'), lines)
+        del stack[name]
+        rslt = list(rslt)
+        if low > index:
+            # no cycle through this tag, the result is complete
+            resolved[name] = rslt
+        return rslt, low
+    
+    for name in tags:
+        write_lines(os.path.join(temp, 'lists/tags_resolved', name+'.txt'), resolve(name, {})[0])
+listing_tags.resolve = True
 
 def listing_sounds(temp):
     full_lines = set()
@@ -1850,8 +2334,7 @@ def listing_languages(temp):
     search_term = ['language.code', 'language.name', 'language.region']
     for lang in glob.iglob('assets/lang/*.lang', root_dir=temp, recursive=False):
         # old format
-        lang = parse_languages_lang(os.path.join(temp, lang))
-        new_lang = {st:lang[st] for st in search_term if st in lang}
+        new_lang = read_language_keys(os.path.join(temp, lang), search_term)
         if len(search_term) == len(new_lang):
             src_lang[new_lang['language.code']] = {'region':new_lang['language.region'],'name':new_lang['language.name']}
     
@@ -1963,7 +2446,7 @@ def listing_various_data_alt(version, temp):
     
     for path in rewrite_files:
         if os.path.exists(path) and os.path.isfile(path):
-            write_text(path, read_text(path))
+            touch(path)
     
     for func in listing_various_functions:
         if func in exclude_funcs:
@@ -1971,5 +2454,101 @@ def listing_various_data_alt(version, temp):
         func(temp)
 
 
+def diff_output(version) -> str:
+    if os.path.isdir(version):
+        return version
+    return find_output(version) or version_path(get_latest(version))
+
+def flat_json(obj, path='') -> dict[str, str]:
+    # {path: compact JSON of the value} of all the leaves of a JSON object
+    import json
+    
+    rslt = {}
+    stack = [(path, obj)]
+    while stack:
+        path, obj = stack.pop()
+        if isinstance(obj, dict) and obj:
+            stack.extend((f'{path}.{k}' if path else k, v) for k,v in obj.items())
+        elif isinstance(obj, list) and obj:
+            stack.extend((f'{path}[{i}]', v) for i,v in enumerate(obj))
+        else:
+            rslt[path] = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    return rslt
+
+def diff_file(old_path, new_path) -> list[str]|None:
+    """Semantic diff of a changed file: lines set difference for .txt, leaves path for JSON. None for the other files"""
+    ext = os.path.splitext(new_path)[1].lower()
+    if ext == '.txt':
+        old = dict.fromkeys(read_lines(old_path))
+        new = dict.fromkeys(read_lines(new_path))
+        return ['- '+l for l in old if l not in new] + ['+ '+l for l in new if l not in old]
+    
+    if ext in ['.json', '.mcmeta']:
+        old = flat_json(read_json(old_path))
+        new = flat_json(read_json(new_path))
+        rslt = []
+        for k in sorted(old.keys() | new.keys()):
+            if k not in new:
+                rslt.append(f'- {k} = {old[k]}')
+            elif k not in old:
+                rslt.append(f'+ {k} = {new[k]}')
+            elif old[k] != new[k]:
+                rslt.append(f'~ {k} = {old[k]} -> {new[k]}')
+        return rslt
+    
+    return None
+
+def diff_generated_data(old, new, workers=None):
+    """Compare two built versions and write the report in the "changes" folder of the new one"""
+    workers = workers or run_jobs.jobs or os.cpu_count() or 1
+    old_dir = diff_output(old)
+    new_dir = diff_output(new)
+    for d in [old_dir, new_dir]:
+        if not os.path.isdir(d):
+            print(f'Imposible to compare the versions. The folder "{d}" doesn\'t exist.')
+            return -1
+    
+    print(f'Compare "{old_dir}" to "{new_dir}"')
+    changes = os.path.join(new_dir, 'changes')
+    
+    async def hashing():
+        # the zip of the version and the previous report are not compared
+        exclude = ['changes', os.path.basename(os.path.normpath(old_dir))+'.zip', os.path.basename(os.path.normpath(new_dir))+'.zip']
+        hashing.old = hash_tree(old_dir, exclude, workers)
+        hashing.new = hash_tree(new_dir, exclude, workers)
+    run_animation(hashing, 'Hashing the files')
+    old_hashes, new_hashes = hashing.old, hashing.new
+    
+    added = [k for k in new_hashes if k not in old_hashes]
+    removed = [k for k in old_hashes if k not in new_hashes]
+    changed = [k for k,v in new_hashes.items() if k in old_hashes and old_hashes[k] != v]
+    
+    # a removed file with the same content as an added one has been moved
+    removed_index = defaultdict(list)
+    for k in removed:
+        removed_index[old_hashes[k]].append(k)
+    moved = {}
+    for k in added:
+        if removed_index.get(new_hashes[k]):
+            moved[removed_index[new_hashes[k]].pop(0)] = k
+    moved_to = set(moved.values())
+    added = [k for k in added if k not in moved_to]
+    removed = [k for k in removed if k not in moved]
+    
+    async def diffing():
+        safe_del(changes)
+        write_lines(os.path.join(changes, 'added.txt'), added)
+        write_lines(os.path.join(changes, 'removed.txt'), removed)
+        write_lines(os.path.join(changes, 'changed.txt'), changed)
+        write_lines(os.path.join(changes, 'moved.txt'), [f'{k} -> {v}' for k,v in moved.items()])
+        for k in changed:
+            lines = diff_file(os.path.join(old_dir, k), os.path.join(new_dir, k))
+            if lines:
+                write_lines(os.path.join(changes, 'files', k+'.txt'), lines)
+    run_animation(diffing, 'Writing the "changes" report')
+    
+    print(f'{len(added)} added, {len(removed)} removed, {len(changed)} changed, {len(moved)} moved')
+
+
 if __name__ == "__main__":
-    main(parse_args())
+    sys.exit(main(parse_args()))